@@ -16,12 +16,13 @@ if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 # Add your model's MetaData object here for 'autogenerate' support
-# Adjust the import path based on your project structure
-try:
-    from ..models import Base  # Move up one level from alembic/ to root, then import models
-    target_metadata = Base.metadata
-except ImportError as e:
-    raise ImportError("Could not import models.py. Check the import path (e.g., from ..models import Base).") from e
+target_metadata = Base.metadata
+
+# Migrate the database the app uses: DATABASE_URL (e.g. postgresql+psycopg2://...)
+# overrides sqlalchemy.url from alembic.ini
+database_url = os.getenv('DATABASE_URL')
+if database_url:
+    config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
 
 # Other values from the config, defined by the needs of env.py, can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -38,7 +39,8 @@ def run_migrations_online():
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
-            render_as_batch=True,  # Required for SQLite to handle DDL in a single batch
+            # SQLite needs table rebuilds for most ALTERs; other databases alter in place
+            render_as_batch=connection.dialect.name == "sqlite",
         )
 
         with context.begin_transaction():
@@ -52,7 +54,7 @@ def run_migrations_offline():
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
-        render_as_batch=True,  # Required for SQLite
+        render_as_batch=url.startswith("sqlite"),  # Required for SQLite
     )
 
     with context.begin_transaction():
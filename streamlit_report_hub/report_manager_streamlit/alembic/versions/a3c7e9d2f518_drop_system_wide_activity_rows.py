@@ -0,0 +1,37 @@
+"""Drop the system-wide rows of org_activity_daily
+
+Revision ID: a3c7e9d2f518
+Revises: e8a1c4f7b290
+Create Date: 2026-10-20 09:26:51.374120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c7e9d2f518'
+down_revision: Union[str, Sequence[str], None] = 'e8a1c4f7b290'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# System-wide figures now sum every organization's rows; a row of totals
+# updated by every write made all writers queue on it
+POPULATE_ALL = """
+INSERT INTO org_activity_daily (organization_id, day, reports, users, dashboards, comments)
+SELECT '*', day, SUM(reports), SUM(users), SUM(dashboards), SUM(comments)
+FROM org_activity_daily
+GROUP BY day
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DELETE FROM org_activity_daily WHERE organization_id = '*'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(POPULATE_ALL)
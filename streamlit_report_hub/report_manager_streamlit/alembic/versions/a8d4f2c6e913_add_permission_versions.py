@@ -0,0 +1,35 @@
+"""Add permission_versions table for permission cache invalidation
+
+Revision ID: a8d4f2c6e913
+Revises: f3a9c6d1b872
+Create Date: 2026-10-18 13:06:52.804417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d4f2c6e913'
+down_revision: Union[str, Sequence[str], None] = 'f3a9c6d1b872'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The app's init_db may already have created it
+    if sa.inspect(op.get_bind()).has_table('permission_versions'):
+        return
+    op.create_table(
+        'permission_versions',
+        sa.Column('scope', sa.String(), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('permission_versions')
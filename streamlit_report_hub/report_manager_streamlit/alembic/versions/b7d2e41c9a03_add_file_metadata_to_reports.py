@@ -0,0 +1,47 @@
+"""Add file metadata columns to reports table
+
+Revision ID: b7d2e41c9a03
+Revises: 80a43a5e972c
+Create Date: 2026-10-17 21:05:12.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e41c9a03'
+down_revision: Union[str, Sequence[str], None] = '80a43a5e972c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = [
+    ('size_bytes', sa.Integer()),
+    ('content_hash', sa.String()),
+    ('mime_type', sa.String()),
+    ('row_count', sa.Integer()),
+    ('column_count', sa.Integer()),
+    ('page_count', sa.Integer()),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('reports')}
+    for name, column_type in COLUMNS:
+        # The app's init_db may already have added it
+        if name not in existing:
+            op.add_column('reports', sa.Column(name, column_type, nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('reports', 'page_count')
+    op.drop_column('reports', 'column_count')
+    op.drop_column('reports', 'row_count')
+    op.drop_column('reports', 'mime_type')
+    op.drop_column('reports', 'content_hash')
+    op.drop_column('reports', 'size_bytes')
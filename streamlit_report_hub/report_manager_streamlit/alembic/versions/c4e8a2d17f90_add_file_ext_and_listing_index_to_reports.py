@@ -0,0 +1,48 @@
+"""Add file_ext column and listing index to reports table
+
+Revision ID: c4e8a2d17f90
+Revises: b7d2e41c9a03
+Create Date: 2026-10-17 22:14:37.902114
+
+"""
+from typing import Sequence, Union
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2d17f90'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e41c9a03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    connection = op.get_bind()
+    inspector = sa.inspect(connection)
+    # The app's init_db may already have added the column and the index
+    if 'file_ext' not in {c['name'] for c in inspector.get_columns('reports')}:
+        op.add_column('reports', sa.Column('file_ext', sa.String(), nullable=True))
+    if 'ix_reports_org_folder_created' not in {i['name'] for i in inspector.get_indexes('reports')}:
+        op.create_index(
+            'ix_reports_org_folder_created', 'reports',
+            ['organization_id', 'folder_id', 'created_at'], unique=False
+        )
+
+    reports = sa.table('reports', sa.column('id', sa.String), sa.column('filename', sa.String),
+                       sa.column('file_ext', sa.String))
+    rows = connection.execute(
+        sa.select(reports.c.id, reports.c.filename).where(reports.c.file_ext.is_(None))
+    ).fetchall()
+    for report_id, filename in rows:
+        ext = os.path.splitext(filename)[1].lstrip('.').lower() or None
+        connection.execute(reports.update().where(reports.c.id == report_id).values(file_ext=ext))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reports_org_folder_created', table_name='reports')
+    op.drop_column('reports', 'file_ext')
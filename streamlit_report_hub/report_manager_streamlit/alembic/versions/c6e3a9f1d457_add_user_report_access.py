@@ -0,0 +1,59 @@
+"""Add materialized user_report_access table
+
+Revision ID: c6e3a9f1d457
+Revises: a8d4f2c6e913
+Create Date: 2026-10-18 16:22:09.517630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e3a9f1d457'
+down_revision: Union[str, Sequence[str], None] = 'a8d4f2c6e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same derivation as modules/report_access.py; verify afterwards with
+#   python -m modules.report_access --check
+POPULATE = """
+INSERT INTO user_report_access (user_id, report_id, level)
+SELECT user_id, report_id,
+       CASE MAX(rank) WHEN 4 THEN 'Owner' WHEN 3 THEN 'Editor' WHEN 2 THEN 'Commenter' ELSE 'Viewer' END
+FROM (
+    SELECT owner_id AS user_id, id AS report_id, 4 AS rank FROM reports WHERE owner_id IS NOT NULL
+    UNION ALL
+    SELECT p.user_id, p.report_id, {rank} FROM report_permissions p WHERE p.user_id IS NOT NULL
+    UNION ALL
+    SELECT m.user_id, p.report_id, {rank} FROM report_permissions p
+    JOIN group_members m ON m.group_id = p.group_id
+) grants
+GROUP BY user_id, report_id
+HAVING MAX(rank) > 0
+""".format(rank="CASE p.level WHEN 'Owner' THEN 4 WHEN 'Editor' THEN 3 "
+                "WHEN 'Commenter' THEN 2 WHEN 'Viewer' THEN 1 ELSE 0 END")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The app's init_db may already have created it; modules/report_access.py
+    # fills it on first use
+    if sa.inspect(op.get_bind()).has_table('user_report_access'):
+        return
+    op.create_table(
+        'user_report_access',
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('report_id', sa.String(), sa.ForeignKey('reports.id'), primary_key=True),
+        sa.Column('level', sa.String(), nullable=False),
+    )
+    op.create_index('ix_user_report_access_report_id', 'user_report_access', ['report_id'], unique=False)
+    op.execute(POPULATE)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_report_access_report_id', table_name='user_report_access')
+    op.drop_table('user_report_access')
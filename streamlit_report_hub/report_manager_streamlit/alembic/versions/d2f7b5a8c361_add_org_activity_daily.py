@@ -0,0 +1,72 @@
+"""Add org_activity_daily rollup table
+
+Revision ID: d2f7b5a8c361
+Revises: c6e3a9f1d457
+Create Date: 2026-10-18 19:03:44.208915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f7b5a8c361'
+down_revision: Union[str, Sequence[str], None] = 'c6e3a9f1d457'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same derivation as modules/activity.py; verify afterwards with
+#   python -m modules.activity --check
+POPULATE = """
+INSERT INTO org_activity_daily (organization_id, day, reports, users, dashboards, comments)
+SELECT organization_id, day, SUM(reports), SUM(users), SUM(dashboards), SUM(comments)
+FROM (
+    SELECT COALESCE(organization_id, '') AS organization_id, DATE(created_at) AS day,
+           1 AS reports, 0 AS users, 0 AS dashboards, 0 AS comments
+    FROM reports WHERE created_at IS NOT NULL
+    UNION ALL
+    SELECT COALESCE(organization_id, ''), DATE(created_at), 0, 1, 0, 0
+    FROM users WHERE created_at IS NOT NULL
+    UNION ALL
+    SELECT COALESCE(organization_id, ''), DATE(created_at), 0, 0, 1, 0
+    FROM dashboards WHERE created_at IS NOT NULL
+    UNION ALL
+    SELECT COALESCE(r.organization_id, ''), DATE(c.created_at), 0, 0, 0, 1
+    FROM comments c JOIN reports r ON r.id = c.report_id WHERE c.created_at IS NOT NULL
+) created
+GROUP BY organization_id, day
+"""
+
+# System-wide totals per day, under organization_id '*'
+POPULATE_ALL = """
+INSERT INTO org_activity_daily (organization_id, day, reports, users, dashboards, comments)
+SELECT '*', day, SUM(reports), SUM(users), SUM(dashboards), SUM(comments)
+FROM org_activity_daily
+GROUP BY day
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The app's init_db may already have created it; modules/activity.py
+    # fills it on first use
+    if sa.inspect(op.get_bind()).has_table('org_activity_daily'):
+        return
+    op.create_table(
+        'org_activity_daily',
+        sa.Column('organization_id', sa.String(), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('reports', sa.Integer(), nullable=False),
+        sa.Column('users', sa.Integer(), nullable=False),
+        sa.Column('dashboards', sa.Integer(), nullable=False),
+        sa.Column('comments', sa.Integer(), nullable=False),
+    )
+    op.execute(POPULATE)
+    op.execute(POPULATE_ALL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('org_activity_daily')
@@ -0,0 +1,59 @@
+"""Add report_search_documents table
+
+Revision ID: d91b5c3e6a28
+Revises: c4e8a2d17f90
+Create Date: 2026-10-17 23:02:51.337406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91b5c3e6a28'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a2d17f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# A document per existing report, as db.init_db does, so search finds them by
+# title, filename and folder; extract their PDF text afterwards with
+#   python -m modules.search_index --missing
+POPULATE = """
+INSERT INTO report_search_documents (report_id, title, filename, folder, columns, body)
+SELECT r.id, COALESCE(r.title, ''), COALESCE(r.filename, ''), COALESCE(f.name, ''), '', ''
+FROM reports r LEFT JOIN folders f ON f.id = r.folder_id
+WHERE NOT EXISTS (SELECT 1 FROM report_search_documents d WHERE d.report_id = r.id)
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The SQLite FTS5 table and its sync triggers are created by
+    # modules/search_index.py on first use and index these documents.
+    # The app's init_db may already have created the table.
+    if not sa.inspect(op.get_bind()).has_table('report_search_documents'):
+        op.create_table(
+            'report_search_documents',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('report_id', sa.String(), sa.ForeignKey('reports.id'), nullable=False, unique=True),
+            sa.Column('title', sa.String(), nullable=False),
+            sa.Column('filename', sa.String(), nullable=False),
+            sa.Column('folder', sa.String(), nullable=False),
+            sa.Column('columns', sa.Text(), nullable=False),
+            sa.Column('body', sa.Text(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+    op.execute(POPULATE)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS report_search_{suffix}")
+        op.execute("DROP TABLE IF EXISTS report_search")
+    op.drop_table('report_search_documents')
@@ -0,0 +1,41 @@
+"""Add blobs table for content-addressed report files
+
+Revision ID: e5f2a7c9b314
+Revises: d91b5c3e6a28
+Create Date: 2026-10-18 00:12:09.551923
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f2a7c9b314'
+down_revision: Union[str, Sequence[str], None] = 'd91b5c3e6a28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The app's init_db may already have created it
+    if sa.inspect(op.get_bind()).has_table('blobs'):
+        return
+    # Existing files are moved into the store with: python -m modules.blob_store
+    op.create_table(
+        'blobs',
+        sa.Column('path', sa.String(), primary_key=True),
+        sa.Column('content_hash', sa.String(), nullable=False),
+        sa.Column('size_bytes', sa.Integer(), nullable=True),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_blobs_content_hash', 'blobs', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_blobs_content_hash', table_name='blobs')
+    op.drop_table('blobs')
@@ -0,0 +1,42 @@
+"""Add dataset_profiles table for the ingestion pipeline
+
+Revision ID: e8a1c4f7b290
+Revises: d2f7b5a8c361
+Create Date: 2026-10-19 10:14:36.902731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a1c4f7b290'
+down_revision: Union[str, Sequence[str], None] = 'd2f7b5a8c361'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The app's init_db may already have created it
+    if sa.inspect(op.get_bind()).has_table('dataset_profiles'):
+        return
+    # Keyed by report_id, the only column the pipeline looks profiles up by
+    op.create_table(
+        'dataset_profiles',
+        sa.Column('report_id', sa.String(), sa.ForeignKey('reports.id'), primary_key=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('dataset_version', sa.String(), nullable=True),
+        sa.Column('row_count', sa.Integer(), nullable=True),
+        sa.Column('column_count', sa.Integer(), nullable=True),
+        sa.Column('columns', sa.JSON(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('dataset_profiles')
@@ -0,0 +1,56 @@
+"""Add indexes for report, permission, visualization and comment lookups
+
+Revision ID: f3a9c6d1b872
+Revises: e5f2a7c9b314
+Create Date: 2026-10-18 09:41:27.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c6d1b872'
+down_revision: Union[str, Sequence[str], None] = 'e5f2a7c9b314'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# reports.organization_id is served by ix_reports_org_folder_created.
+# tests/test_query_plans.py fails if the hot lookups stop using them
+# (set TEST_DATABASE_URL to an empty PostgreSQL database to check there)
+INDEXES = [
+    ('ix_group_members_user_id', 'group_members', ['user_id']),
+    ('ix_group_members_group_id', 'group_members', ['group_id']),
+    ('ix_reports_owner_folder', 'reports', ['owner_id', 'folder_id']),
+    ('ix_reports_folder_id', 'reports', ['folder_id']),
+    ('ix_report_permissions_report_user', 'report_permissions', ['report_id', 'user_id']),
+    ('ix_report_permissions_report_group', 'report_permissions', ['report_id', 'group_id']),
+    ('ix_report_permissions_user_report', 'report_permissions', ['user_id', 'report_id']),
+    ('ix_report_permissions_group_report', 'report_permissions', ['group_id', 'report_id']),
+    ('ix_visualizations_dashboard_position', 'visualizations', ['dashboard_id', 'position']),
+    ('ix_dashboard_permissions_dashboard_user', 'dashboard_permissions', ['dashboard_id', 'user_id']),
+    ('ix_dashboard_permissions_dashboard_group', 'dashboard_permissions', ['dashboard_id', 'group_id']),
+    ('ix_dashboard_permissions_user_dashboard', 'dashboard_permissions', ['user_id', 'dashboard_id']),
+    ('ix_dashboard_permissions_group_dashboard', 'dashboard_permissions', ['group_id', 'dashboard_id']),
+    ('ix_comments_report_created', 'comments', ['report_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = {}
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if table not in existing:
+            existing[table] = {i['name'] for i in inspector.get_indexes(table)}
+        # The app's init_db may already have created it
+        if name not in existing[table]:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -1,6 +1,6 @@
 # app.py
 import streamlit as st
-from db import init_db
+from db import init_db, rerun_scope
 from models import User, Organization, Role, Group, Base
 from modules.auth import logout, invite_user_flow, users_and_invites_view, superadmin_org_management
 from modules.groups import group_management_page
@@ -13,6 +13,7 @@ from page.reset_password_page import reset_password
 from modules.organization import my_organization_page
 from page.dashboard_page import dashboards_main_page 
 from page.home_page import home_page 
+from modules.pdf_preview import remove_published_copies
 
 
 import os
@@ -20,6 +21,8 @@ import os
 init_db(Base, Role)
 UPLOAD_DIR = 'uploads'
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+# PDFs must not stay reachable through static/, see modules/pdf_preview.py
+remove_published_copies()
 
 st.set_page_config(page_title="Report Manager (Streamlit)", layout="wide")
 
@@ -144,4 +147,6 @@ def main_app():
             reports_page()
 
 if __name__ == "__main__":
-    main_app()
\ No newline at end of file
+    # One database session and connection for the whole script run
+    with rerun_scope():
+        main_app()
\ No newline at end of file
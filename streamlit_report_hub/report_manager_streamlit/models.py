@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Table, JSON
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Date, Table, JSON, Index, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import datetime
@@ -18,7 +18,10 @@ group_members = Table(
     "group_members",
     Base.metadata,
     Column("user_id", String, ForeignKey("users.id"), primary_key=True),
-    Column("group_id", String, ForeignKey("groups.id"), primary_key=True)
+    Column("group_id", String, ForeignKey("groups.id"), primary_key=True),
+    # Databases created by early releases keyed this table on a separate id column
+    Index("ix_group_members_user_id", "user_id"),
+    Index("ix_group_members_group_id", "group_id"),
 )
 
 # -----------------------------
@@ -47,6 +50,7 @@ class User(Base):
     organization = relationship("Organization", back_populates="users")
     reports = relationship("Report", back_populates="owner", cascade="all, delete-orphan")
     groups = relationship("Group", secondary=group_members, back_populates="users")
+    report_access = relationship("UserReportAccess", cascade="all, delete-orphan")
 
 # -----------------------------
 # Organization model
@@ -102,12 +106,74 @@ class Report(Base):
     organization_id = Column(String, ForeignKey("organizations.id"), nullable=False)
     folder_id = Column(String, ForeignKey("folders.id"), nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+    # File metadata captured at upload / save so listings never stat the file
+    size_bytes = Column(Integer, nullable=True)
+    content_hash = Column(String, nullable=True)  # SHA-256 hex digest
+    mime_type = Column(String, nullable=True)
+    row_count = Column(Integer, nullable=True)
+    column_count = Column(Integer, nullable=True)
+    page_count = Column(Integer, nullable=True)
+    file_ext = Column(String, nullable=True)  # lowercased, without the dot
 
     owner = relationship("User", back_populates="reports")
     organization = relationship("Organization", back_populates="reports")
     folder = relationship("Folder", back_populates="reports")
     permissions = relationship("ReportPermission", back_populates="report", cascade="all, delete-orphan")
     comments = relationship("Comment", back_populates="report", cascade="all, delete-orphan")
+    profile = relationship("DatasetProfile", back_populates="report", uselist=False, cascade="all, delete-orphan")
+    search_document = relationship("SearchDocument", back_populates="report", uselist=False, cascade="all, delete-orphan")
+    user_access = relationship("UserReportAccess", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Folder listings: filter by org + folder, page by created_at
+        Index("ix_reports_org_folder_created", "organization_id", "folder_id", "created_at"),
+        # "My reports" in a folder, and folder counts / moves
+        Index("ix_reports_owner_folder", "owner_id", "folder_id"),
+        Index("ix_reports_folder_id", "folder_id"),
+    )
+
+# -----------------------------
+# Content-addressed file blobs (see modules/blob_store.py)
+# -----------------------------
+class Blob(Base):
+    __tablename__ = "blobs"
+    path = Column(String, primary_key=True)  # uploads/blobs/ab/cd/<sha256>.<ext>
+    content_hash = Column(String, nullable=False, index=True)
+    size_bytes = Column(Integer, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)  # reports whose filepath is this blob
+    created_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+# -----------------------------
+# Dataset profile (filled by the ingestion pipeline)
+# -----------------------------
+class DatasetProfile(Base):
+    __tablename__ = "dataset_profiles"
+    report_id = Column(String, ForeignKey("reports.id"), primary_key=True)
+    status = Column(String, nullable=False, default="pending")  # pending, processing, ready, failed
+    dataset_version = Column(String, nullable=True)
+    row_count = Column(Integer, nullable=True)
+    column_count = Column(Integer, nullable=True)
+    columns = Column(JSON, nullable=True)  # column catalog, see modules/column_stats.py
+    error = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    report = relationship("Report", back_populates="profile")
+
+# -----------------------------
+# Search document (text indexed by modules/search_index.py)
+# -----------------------------
+class SearchDocument(Base):
+    __tablename__ = "report_search_documents"
+    id = Column(Integer, primary_key=True, autoincrement=True)  # FTS5 rowid
+    report_id = Column(String, ForeignKey("reports.id"), nullable=False, unique=True)
+    title = Column(String, nullable=False, default="")
+    filename = Column(String, nullable=False, default="")
+    folder = Column(String, nullable=False, default="")
+    columns = Column(Text, nullable=False, default="")  # CSV/XLSX column headers
+    body = Column(Text, nullable=False, default="")  # extracted PDF text
+    updated_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    report = relationship("Report", back_populates="search_document")
 
 class ReportPermission(Base):
     __tablename__ = "report_permissions"
@@ -121,6 +187,27 @@ class ReportPermission(Base):
     user = relationship("User")
     group = relationship("Group")
 
+    __table_args__ = (
+        # Levels on given reports, and the reports shared with a user or group
+        Index("ix_report_permissions_report_user", "report_id", "user_id"),
+        Index("ix_report_permissions_report_group", "report_id", "group_id"),
+        Index("ix_report_permissions_user_report", "user_id", "report_id"),
+        Index("ix_report_permissions_group_report", "group_id", "report_id"),
+    )
+
+# -----------------------------
+# Materialized report access (see modules/report_access.py)
+# -----------------------------
+class UserReportAccess(Base):
+    __tablename__ = "user_report_access"
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    report_id = Column(String, ForeignKey("reports.id"), primary_key=True)
+    level = Column(String, nullable=False)  # best of ownership, direct and group grants
+
+    __table_args__ = (
+        Index("ix_user_report_access_report_id", "report_id"),
+    )
+
 # -----------------------------
 # Dashboard model
 # -----------------------------
@@ -159,6 +246,10 @@ class Visualization(Base):
 
     dashboard = relationship("Dashboard", back_populates="visualizations")
 
+    __table_args__ = (
+        Index("ix_visualizations_dashboard_position", "dashboard_id", "position"),
+    )
+
 class DashboardPermission(Base):
     __tablename__ = "dashboard_permissions"
     id = Column(String, primary_key=True, default=gen_uuid)
@@ -171,6 +262,33 @@ class DashboardPermission(Base):
     user = relationship("User")
     group = relationship("Group")
 
+    __table_args__ = (
+        Index("ix_dashboard_permissions_dashboard_user", "dashboard_id", "user_id"),
+        Index("ix_dashboard_permissions_dashboard_group", "dashboard_id", "group_id"),
+        Index("ix_dashboard_permissions_user_dashboard", "user_id", "dashboard_id"),
+        Index("ix_dashboard_permissions_group_dashboard", "group_id", "dashboard_id"),
+    )
+
+# -----------------------------
+# Permission change counter (see modules/permissions.py)
+# -----------------------------
+class PermissionVersion(Base):
+    __tablename__ = "permission_versions"
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)  # bumped by every ACL or group membership change
+
+# -----------------------------
+# Daily activity rollup (see modules/activity.py)
+# -----------------------------
+class OrgActivityDaily(Base):
+    __tablename__ = "org_activity_daily"
+    organization_id = Column(String, primary_key=True)  # "" for users outside any organization
+    day = Column(Date, primary_key=True)
+    reports = Column(Integer, nullable=False, default=0)
+    users = Column(Integer, nullable=False, default=0)
+    dashboards = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+
 class Comment(Base):
     __tablename__ = "comments"
     id = Column(String, primary_key=True, default=gen_uuid)
@@ -181,3 +299,7 @@ class Comment(Base):
 
     report = relationship("Report", back_populates="comments")
     user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_comments_report_created", "report_id", "created_at"),
+    )
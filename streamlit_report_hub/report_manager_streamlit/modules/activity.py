@@ -0,0 +1,308 @@
+import sys
+import datetime
+import threading
+from collections import defaultdict
+import pandas as pd
+from sqlalchemy import select, insert, union_all, func, literal, event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from models import OrgActivityDaily, Organization, User, Report, Dashboard, Comment
+
+# -------------------------
+# Daily Activity Rollups
+# -------------------------
+# org_activity_daily counts the reports, users, dashboards and comments
+# created per organization per day (by created_at), so "this week / this
+# month" counters and activity trends sum one row per day instead of
+# scanning the tables; system-wide figures sum every organization's rows.
+# There is no row of system-wide totals: every write would update it, so
+# all writers would queue on that one row.
+# A before_flush listener keeps it current: rows added or deleted in any
+# session (uploads, invites and registrations, dashboard creation,
+# comments, and the cascades of report, user and organization deletes)
+# adjust their day's counters in the same transaction, and rows moved to
+# another organization (e.g. inviting an existing user) move their counts.
+# Counters are adjusted with INSERT ... ON CONFLICT DO UPDATE, so two writers
+# creating the same (organization, day) row both count.
+# Check or rebuild from the source tables: python -m modules.activity [--check]
+NO_ORG = ""  # bucket for users outside any organization
+LEGACY_ALL_ORGS = "*"  # system-wide totals kept by earlier releases, removed on first use
+COUNTERS = ("reports", "users", "dashboards", "comments")
+_TRACKED = {Report: "reports", User: "users", Dashboard: "dashboards", Comment: "comments"}
+_MOVABLE = (Report, User, Dashboard)  # the tracked models with an organization_id
+_populated = False
+_populated_lock = threading.Lock()
+
+
+def _org_of(session, obj, pending_reports):
+    if isinstance(obj, Comment):
+        # Pending comments only carry report_id; the report may be pending in the same flush
+        report = obj.report or pending_reports.get(obj.report_id) or session.get(Report, obj.report_id)
+        org_id = report.organization_id if report is not None else None
+    else:
+        org_id = obj.organization_id
+    return org_id or NO_ORG
+
+
+def _moved(session, obj):
+    """(old org, new org) when this flush changes obj's organization_id, else None."""
+    history = inspect(obj).attrs.organization_id.history
+    if not history.added:
+        return None
+    if history.deleted:
+        old = history.deleted[0]
+    else:
+        # The old value was None or not loaded; the row still holds it before the flush
+        model = type(obj)
+        old = session.query(model.organization_id).filter(model.id == obj.id).scalar()
+    old, new = old or NO_ORG, obj.organization_id or NO_ORG
+    return (old, new) if old != new else None
+
+
+def _day(obj):
+    if obj.created_at is None:
+        # Set here rather than by the column default so the day is known before the INSERT
+        obj.created_at = datetime.datetime.now(datetime.timezone.utc)
+    return obj.created_at.date()
+
+
+_UPSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+def _apply(session, deltas):
+    """
+    Add deltas {(org_id, day): {counter: n}} to the rollup rows, creating
+    missing ones, in one INSERT ... ON CONFLICT DO UPDATE. Rows are listed in
+    key order so concurrent writers lock them in the same order.
+    """
+    rows = [
+        {"organization_id": org_id, "day": day, **{name: counts.get(name, 0) for name in COUNTERS}}
+        for (org_id, day), counts in sorted(deltas.items()) if any(counts.values())
+    ]
+    if not rows:
+        return
+    upsert = _UPSERTS.get(session.get_bind().dialect.name)
+    if upsert is None:
+        for row in rows:
+            changes = {getattr(OrgActivityDaily, name): getattr(OrgActivityDaily, name) + row[name]
+                       for name in COUNTERS if row[name]}
+            updated = session.query(OrgActivityDaily).filter_by(
+                organization_id=row["organization_id"], day=row["day"]
+            ).update(changes, synchronize_session=False)
+            if not updated:
+                session.execute(insert(OrgActivityDaily).values(**row))
+        return
+    statement = upsert(OrgActivityDaily).values(rows)
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[OrgActivityDaily.organization_id, OrgActivityDaily.day],
+        set_={name: getattr(OrgActivityDaily, name) + statement.excluded[name] for name in COUNTERS},
+    ))
+
+
+@event.listens_for(Session, "before_flush")
+def _record_activity(session, flush_context, instances):
+    added = [obj for obj in session.new if type(obj) in _TRACKED]
+    removed = [obj for obj in session.deleted if type(obj) in _TRACKED]
+    removed_orgs = [obj for obj in session.deleted if isinstance(obj, Organization)]
+    moved = [
+        (obj, orgs) for obj in session.dirty
+        if isinstance(obj, _MOVABLE) and obj.created_at is not None and (orgs := _moved(session, obj))
+    ]
+    if not (added or removed or removed_orgs or moved):
+        return
+    # Counts the rows as they were before this flush, so the deltas below still apply
+    ensure_activity_rollups(session)
+
+    dropped = {org.id for org in removed_orgs}
+    pending_reports = {obj.id: obj for obj in added if isinstance(obj, Report)}
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for objects, step in ((added, 1), (removed, -1)):
+        for obj in objects:
+            org_id, day, counter = _org_of(session, obj, pending_reports), _day(obj), _TRACKED[type(obj)]
+            if org_id not in dropped:
+                deltas[(org_id, day)][counter] += step
+    for obj, (old_org, new_org) in moved:
+        days = [(_TRACKED[type(obj)], _day(obj))]
+        if isinstance(obj, Report):
+            # Its comments are counted under the report's organization
+            days += [
+                ("comments", created_at.date()) for (created_at,) in session.query(Comment.created_at).filter(
+                    Comment.report_id == obj.id, Comment.created_at.is_not(None)
+                )
+            ]
+        for counter, day in days:
+            if old_org not in dropped:
+                deltas[(old_org, day)][counter] -= 1
+            if new_org not in dropped:
+                deltas[(new_org, day)][counter] += 1
+    for org in removed_orgs:
+        # Deleting an organization keeps its users, without an organization
+        for user in org.users:
+            if user not in session.deleted:
+                deltas[(NO_ORG, _day(user))]["users"] += 1
+    if dropped:
+        session.query(OrgActivityDaily).filter(OrgActivityDaily.organization_id.in_(dropped)).delete(
+            synchronize_session=False
+        )
+    _apply(session, deltas)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_populated(session):
+    global _populated
+    if session.info.pop("activity_rebuilt", False):
+        _populated = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rebuild(session):
+    session.info.pop("activity_rebuilt", None)
+
+
+def ensure_activity_rollups(session):
+    """
+    Fill the table on first use when it is empty but the source tables are
+    not (databases from before it existed). Returns True if it was rebuilt
+    in session's transaction; the caller commits.
+    """
+    global _populated
+    if _populated or session.info.get("activity_rebuilt"):
+        return False
+    with _populated_lock:
+        legacy = session.query(OrgActivityDaily).filter_by(organization_id=LEGACY_ALL_ORGS)
+        if legacy.first() is not None:
+            legacy.delete(synchronize_session=False)
+            session.info["activity_rebuilt"] = True
+            print("[Activity] Removed the system-wide rows of earlier releases from org_activity_daily.")
+            return True
+        if session.query(OrgActivityDaily.day).first() is not None:
+            _populated = True
+            return False
+        if all(session.query(model.id).first() is None for model in _TRACKED):
+            _populated = True
+            return False
+        rebuild_activity_rollups(session)
+        session.info["activity_rebuilt"] = True
+        print("[Activity] Built org_activity_daily from the source tables.")
+        return True
+
+
+def prepare_activity_rollups():
+    """
+    ensure_activity_rollups for read paths: a needed rebuild runs and commits
+    in a short-lived session of its own, never in the caller's.
+    """
+    if _populated:
+        return
+    from db import SessionLocal
+
+    s = SessionLocal()
+    try:
+        if ensure_activity_rollups(s):
+            s.commit()
+    except Exception as e:
+        s.rollback()
+        print(f"[Activity][Error] Failed to build org_activity_daily: {e}")
+    finally:
+        s.close()
+
+
+def activity_trend(session, org_id=None, days=30):
+    """Daily counters of org_id (every organization when None) for the last `days` UTC days, one row per day."""
+    prepare_activity_rollups()
+    # Days are UTC dates, like the created_at timestamps they are counted from
+    since = datetime.datetime.now(datetime.timezone.utc).date() - datetime.timedelta(days=days - 1)
+    query = session.query(
+        OrgActivityDaily.day, *[func.sum(getattr(OrgActivityDaily, name)) for name in COUNTERS]
+    ).filter(OrgActivityDaily.day >= since).group_by(OrgActivityDaily.day)
+    if org_id:
+        query = query.filter(OrgActivityDaily.organization_id == org_id)
+    rows = {day: counts for day, *counts in query}
+    index = [since + datetime.timedelta(days=i) for i in range(days)]
+    return pd.DataFrame(
+        [[day, *(int(n or 0) for n in rows.get(day, [0] * len(COUNTERS)))] for day in index],
+        columns=["Date", *[name.capitalize() for name in COUNTERS]],
+    )
+
+
+# -------------------------
+# Consistency check / rebuild
+# -------------------------
+def _created(model, org_column, counter, *joins):
+    """org_id, day and a 1 in counter's column for every row of model."""
+    query = select(
+        func.coalesce(org_column, NO_ORG).label("organization_id"),
+        func.date(model.created_at).label("day"),
+        *[literal(1 if name == counter else 0).label(name) for name in COUNTERS],
+    ).select_from(model)
+    for target, condition in joins:
+        query = query.join(target, condition)
+    return query.where(model.created_at.is_not(None))
+
+
+def _rollup_rows():
+    """SELECT organization_id, day and the counters derived from the source tables."""
+    created = union_all(
+        _created(Report, Report.organization_id, "reports"),
+        _created(User, User.organization_id, "users"),
+        _created(Dashboard, Dashboard.organization_id, "dashboards"),
+        _created(Comment, Report.organization_id, "comments", (Report, Report.id == Comment.report_id)),
+    ).cte("created")
+    sums = [func.sum(created.c[name]).label(name) for name in COUNTERS]
+    return select(created.c.organization_id, created.c.day, *sums).group_by(created.c.organization_id, created.c.day)
+
+
+def rebuild_activity_rollups(session):
+    """Replace every row with counts derived from the source tables (the caller commits)."""
+    session.query(OrgActivityDaily).delete(synchronize_session=False)
+    session.execute(insert(OrgActivityDaily).from_select(["organization_id", "day", *COUNTERS], _rollup_rows()))
+
+
+def check_activity_rollups(repair=True):
+    """
+    Compare org_activity_daily with the source tables and rebuild it when
+    they disagree. Returns the (organization_id, day) keys that differ.
+    Run from the app directory: python -m modules.activity --check
+    """
+    from db import SessionLocal
+
+    s = SessionLocal()
+    try:
+        expected = {(org_id, str(day)): tuple(counts) for org_id, day, *counts in s.execute(_rollup_rows())}
+        actual = {
+            (org_id, str(day)): tuple(counts)
+            for org_id, day, *counts in s.query(
+                OrgActivityDaily.organization_id, OrgActivityDaily.day,
+                *[getattr(OrgActivityDaily, name) for name in COUNTERS],
+            )
+            if any(counts)
+        }
+        differing = {key for key in expected.keys() | actual.keys() if expected.get(key) != actual.get(key)}
+        print(f"[Activity] {len(actual)} row(s): {len(differing)} differ from the source tables.")
+        if repair and differing:
+            rebuild_activity_rollups(s)
+            s.commit()
+            print(f"[Activity] Rebuilt org_activity_daily ({len(expected)} row(s)).")
+        return differing
+    except Exception as e:
+        s.rollback()
+        print(f"[Activity][Error] Failed to check org_activity_daily: {e}")
+        raise
+    finally:
+        s.close()
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        check_activity_rollups()
+    else:
+        from db import SessionLocal
+
+        s = SessionLocal()
+        try:
+            rebuild_activity_rollups(s)
+            s.commit()
+            print(f"[Activity] Rebuilt org_activity_daily ({s.query(OrgActivityDaily).count()} row(s)).")
+        finally:
+            s.close()
@@ -0,0 +1,48 @@
+import pandas as pd
+
+# -------------------------
+# Chart Aggregation
+# -------------------------
+# Bar/Line/Pie charts are reduced to one row per group before plotting, so
+# Plotly only receives as many points as there are distinct categories.
+AGGREGATIONS = ["sum", "mean", "count", "min", "max", "none"]
+AGGREGATED_TYPES = ["Bar", "Line", "Pie"]
+
+
+def default_aggregation(viz_type):
+    """
+    Aggregation used when a config has no "agg" key. Bar and Pie default to
+    sum, which is what Plotly already draws for repeated categories (stacked
+    bars, summed slices). Line keeps the raw points.
+    """
+    return "sum" if viz_type in ("Bar", "Pie") else "none"
+
+
+def _group_fields(viz_type, config):
+    if viz_type == "Pie":
+        keys, value = [config.get("names")], config.get("values")
+    else:
+        keys, value = [config.get("x"), config.get("color")], config.get("y")
+    keys = list(dict.fromkeys(k for k in keys if k))
+    return keys, value
+
+
+def aggregate_for_chart(df, viz_type, config):
+    """Group df by the chart's category fields and aggregate its value field."""
+    if viz_type not in AGGREGATED_TYPES:
+        return df
+    agg = config.get("agg") or default_aggregation(viz_type)
+    if agg == "none" or agg not in AGGREGATIONS:
+        return df
+
+    keys, value = _group_fields(viz_type, config)
+    if not keys or not value or value in keys:
+        return df
+    if any(col not in df.columns for col in keys + [value]):
+        return df
+
+    series = df[value]
+    if agg in ("sum", "mean") and not pd.api.types.is_numeric_dtype(series):
+        series = pd.to_numeric(series, errors="coerce")
+    grouped = series.groupby([df[k] for k in keys], sort=True, observed=True, dropna=False)
+    return grouped.agg(agg).reset_index()
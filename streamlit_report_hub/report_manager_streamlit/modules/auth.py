@@ -1,10 +1,12 @@
 
 from passlib.hash import pbkdf2_sha256
 import secrets
-from db import SessionLocal, get_session
+from db import SessionLocal, get_session, release_session
 from models import User, Organization, Role
 import streamlit as st
 from .utils import safe_rerun
+from .permissions import bump_permission_version
+from .blob_store import release_report_files
 import os
 import logging
 
@@ -93,7 +95,7 @@ def create_invite(inviter_id: str, email: str, org_id: str, role_name: str) -> s
         logger.error(f"Error in create_invite for {email}: {e}")
         raise e
     finally:
-        session.close()
+        release_session(session)
 
 def superadmin_exists():
     """Return True if a Superadmin user exists."""
@@ -107,7 +109,7 @@ def superadmin_exists():
         count = s.query(User).filter_by(role_id=super_role.id).count()
         return count > 0
     finally:
-        s.close()
+        release_session(s)
 
 def get_role_name(role_id):
     """Return the role name for a role_id (or None)."""
@@ -115,10 +117,10 @@ def get_role_name(role_id):
     if not s:
         return None
     try:
-        role = s.query(Role).filter_by(id=role_id).first()
+        role = s.get(Role, role_id) if role_id is not None else None  # identity map hit after the first
         return role.name if role else None
     finally:
-        s.close()
+        release_session(s)
 
 def logout():
     st.session_state.user = {}
@@ -263,7 +265,7 @@ def users_and_invites_view():
                 st.write("No pending invites.")
             st.markdown("</div>", unsafe_allow_html=True)
     finally:
-        s.close()
+        release_session(s)
 
 
 def superadmin_org_management():
@@ -390,7 +392,10 @@ def superadmin_org_management():
                 if org_to_delete:
                     if st.button(f"✅ Confirm Delete {org_to_delete.name}", key=f"confirm_del_{del_id}"):
                         try:
+                            # Its reports go with it; release their stored files
+                            release_report_files(s, org_to_delete.reports)
                             s.delete(org_to_delete)
+                            bump_permission_version(s)
                             s.commit()
                             st.success(f"Organization '{org_to_delete.name}' deleted.")
                             st.session_state.delete_org_id = None
@@ -399,4 +404,4 @@ def superadmin_org_management():
                             s.rollback()
                             st.error(f"Failed to delete organization: {e}")
     finally:
-        s.close()
+        release_session(s)
@@ -0,0 +1,202 @@
+import os
+import uuid
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from models import Blob
+from .dataset_cache import invalidate_dataset
+from .file_metadata import artifact_key
+from .pdf_preview import remove_thumbnail
+from .storage import get_storage
+
+# -------------------------
+# Content-Addressed Blob Store
+# -------------------------
+# Report files live at uploads/blobs/ab/cd/<sha256>.<ext>, one file per
+# distinct content, so the same export uploaded into several folders or
+# organizations is stored once. Blob rows count the reports pointing at each
+# file; the file and its derived artifacts (columnar cache and PDF thumbnail,
+# both keyed by the content hash) go when the last one is released.
+# Blobs are never modified in place: saving an edit writes a new blob.
+# Releasing the last reference deletes the files only after the transaction
+# commits, so a rollback never leaves a row pointing at a missing file.
+# Blob paths are storage keys (modules/storage.py), so the store can live on
+# local disk or in an S3 bucket.
+BLOB_DIR = os.getenv('BLOB_STORE_DIR', os.path.join('uploads', 'blobs'))
+INCOMING_DIR = os.path.join(BLOB_DIR, '.incoming')
+
+
+def blob_path(content_hash, ext=None):
+    name = f"{content_hash}.{ext}" if ext else content_hash
+    return os.path.join(BLOB_DIR, content_hash[:2], content_hash[2:4], name)
+
+
+def incoming_path(suffix=''):
+    """A fresh temp path on the store's filesystem, for writing a file before it is hashed."""
+    os.makedirs(INCOMING_DIR, exist_ok=True)
+    return os.path.join(INCOMING_DIR, f"{uuid.uuid4().hex}{suffix}")
+
+
+def is_blob_path(filepath):
+    return os.path.abspath(filepath).startswith(os.path.abspath(BLOB_DIR) + os.sep)
+
+
+def store_blob(session, tmp_path, content_hash, ext=None):
+    """
+    Move the file at tmp_path into the store under its hash (dropping it when
+    that content is already stored) and take a reference to the blob.
+    Returns the blob path for Report.filepath; the caller commits.
+    """
+    path = blob_path(content_hash, ext)
+    storage = get_storage()
+    blob = session.query(Blob).filter_by(path=path).first()
+    size_bytes = os.path.getsize(tmp_path)
+    if blob is not None and storage.exists(path):
+        os.remove(tmp_path)
+    else:
+        storage.put_file(tmp_path, path)
+    _add_reference(session, path, content_hash, size_bytes)
+    return path
+
+
+_UPSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+def _add_reference(session, path, content_hash, size_bytes):
+    """
+    Insert the blob row with one reference, or add one to the existing row,
+    in a single statement (INSERT ... ON CONFLICT DO UPDATE), so concurrent
+    first uploads of the same file both count instead of one failing on the
+    primary key.
+    """
+    upsert = _UPSERTS.get(session.get_bind().dialect.name)
+    if upsert is None:
+        if session.query(Blob.path).filter_by(path=path).first() is None:
+            session.add(Blob(path=path, content_hash=content_hash, size_bytes=size_bytes, ref_count=1))
+            session.flush()
+        else:
+            session.query(Blob).filter_by(path=path).update(
+                {Blob.ref_count: Blob.ref_count + 1}, synchronize_session=False
+            )
+        return
+    session.execute(
+        upsert(Blob)
+        .values(path=path, content_hash=content_hash, size_bytes=size_bytes, ref_count=1)
+        .on_conflict_do_update(index_elements=[Blob.path], set_={"ref_count": Blob.ref_count + 1})
+    )
+
+
+def _remove_artifacts(key):
+    invalidate_dataset(key)
+    remove_thumbnail(key)
+
+
+@event.listens_for(Session, "after_commit")
+def _remove_released_files(session):
+    for remove in session.info.pop("released_files", []):
+        try:
+            remove()
+        except Exception as e:
+            print(f"[Blobs][Error] Failed to remove a released file: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_released_files(session):
+    session.info.pop("released_files", None)
+
+
+def _remove_after_commit(session, remove):
+    session.info.setdefault("released_files", []).append(remove)
+
+
+def _remove_local_file(filepath, key):
+    if os.path.exists(filepath):
+        os.remove(filepath)
+    if key:
+        _remove_artifacts(key)
+
+
+def _remove_blob_file(filepath, content_hash):
+    get_storage().delete(filepath)
+    _remove_artifacts(content_hash)
+
+
+def release_blob(session, filepath, key=None):
+    """
+    Drop one reference to the file at filepath. The blob file and its shared
+    artifacts are removed when no report uses it any more; files outside the
+    store (uploaded before it existed) are removed directly, with the
+    artifacts stored under `key`. Files are deleted once the caller commits;
+    returns True if they will be.
+    """
+    blob = session.query(Blob).filter_by(path=filepath).first()
+    if blob is None:
+        # Uploads from before the blob store are always on local disk
+        _remove_after_commit(session, lambda: _remove_local_file(filepath, key))
+        return True
+
+    session.query(Blob).filter_by(path=filepath).update(
+        {Blob.ref_count: Blob.ref_count - 1}, synchronize_session=False
+    )
+    session.refresh(blob)
+    if blob.ref_count > 0:
+        return False
+    session.delete(blob)
+    content_hash = blob.content_hash
+    _remove_after_commit(session, lambda: _remove_blob_file(filepath, content_hash))
+    return True
+
+
+def release_report_files(session, reports):
+    """release_blob for each of reports, which the caller deletes (and commits)."""
+    for report in reports:
+        release_blob(session, report.filepath, artifact_key(report))
+
+
+# -------------------------
+# Migration of pre-store uploads
+# -------------------------
+def migrate_reports_to_blobs():
+    """
+    Move report files stored as uploads/<org>/<report_id>_<name> into the blob
+    store (and so into the configured storage backend), deduplicating
+    identical files. Run it before switching STORAGE_BACKEND to s3.
+    Run from the app directory: python -m modules.blob_store
+    """
+    from db import SessionLocal
+    from models import Report
+    from .file_metadata import sha256_file, file_extension
+
+    s = SessionLocal()
+    moved = failed = 0
+    try:
+        for r in s.query(Report).all():
+            if is_blob_path(r.filepath) or not os.path.exists(r.filepath):
+                continue
+            old_path = r.filepath
+            try:
+                content_hash = r.content_hash or sha256_file(old_path)
+                tmp_path = incoming_path()
+                try:
+                    os.link(old_path, tmp_path)
+                except OSError:
+                    os.replace(old_path, tmp_path)
+                r.filepath = store_blob(s, tmp_path, content_hash, file_extension(r.filename))
+                r.content_hash = content_hash
+                s.commit()
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+                moved += 1
+            except Exception as e:
+                s.rollback()
+                failed += 1
+                print(f"[Blobs][Error] Report {r.id} ({old_path}): {e}")
+    finally:
+        s.close()
+    print(f"[Blobs] Moved {moved} report file(s) into the blob store, {failed} failed.")
+    return moved, failed
+
+
+if __name__ == "__main__":
+    migrate_reports_to_blobs()
@@ -0,0 +1,154 @@
+import datetime
+import pandas as pd
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
+from db import SessionLocal
+from models import Report, DatasetProfile
+from .dataset_cache import dataset_version, load_dataset
+from .file_metadata import artifact_key
+
+# -------------------------
+# Column Statistics Catalog
+# -------------------------
+# Per-report column stats (min/max, null and distinct counts, top values,
+# semantic type) stored in dataset_profiles.columns and computed once per
+# dataset version, so the Chart Builder never scans the data for widgets.
+TOP_N_VALUES = 50
+SAMPLE_SIZE = 200
+
+
+def _json_value(value):
+    """Convert a pandas/numpy scalar into something JSON can store."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    return value if isinstance(value, (int, float, bool, str)) else str(value)
+
+
+def infer_semantic_type(series, distinct_count):
+    """Classify a column as numeric, boolean, datetime, categorical or text."""
+    if pd.api.types.is_bool_dtype(series):
+        return "boolean"
+    if pd.api.types.is_numeric_dtype(series):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    sample = series.dropna().head(SAMPLE_SIZE)
+    if len(sample) and sample.map(lambda v: isinstance(v, str)).all():
+        parsed = pd.to_datetime(sample, errors="coerce", format="mixed")
+        if parsed.notna().mean() >= 0.9:
+            return "datetime"
+    non_null = max(int(series.notna().sum()), 1)
+    if distinct_count <= TOP_N_VALUES or distinct_count / non_null <= 0.05:
+        return "categorical"
+    return "text"
+
+
+def profile_dataframe(df):
+    """Return the column catalog for df as a JSON-serializable list."""
+    null_counts = df.isna().sum()
+    distinct_counts = df.nunique(dropna=True)
+    ranged = df.select_dtypes(include=["number", "datetime"])
+    mins, maxs = ranged.min(), ranged.max()
+    means = df.select_dtypes(include="number").mean()
+
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        semantic_type = infer_semantic_type(series, int(distinct_counts[col]))
+        entry = {
+            "name": str(col),
+            "dtype": str(series.dtype),
+            "semantic_type": semantic_type,
+            "null_count": int(null_counts[col]),
+            "distinct_count": int(distinct_counts[col]),
+            "min": _json_value(mins[col]) if col in ranged.columns else None,
+            "max": _json_value(maxs[col]) if col in ranged.columns else None,
+            "mean": _json_value(means[col]) if col in means.index else None,
+            "top_values": [],
+        }
+        if semantic_type != "numeric":
+            counts = series.value_counts(dropna=True).head(TOP_N_VALUES)
+            entry["top_values"] = [[_json_value(v), int(c)] for v, c in counts.items()]
+        columns.append(entry)
+    return columns
+
+
+def _is_current(profile, version):
+    return (
+        profile is not None
+        and profile.status == "ready"
+        and profile.dataset_version == version
+        and profile.columns
+        and all("semantic_type" in c for c in profile.columns)
+    )
+
+
+def _store_catalog(report_id, version, row_count, column_count, columns):
+    """
+    Save a computed catalog in its own short-lived session, so reading a
+    catalog never commits (or leaves writes in) the caller's session.
+    """
+    s = SessionLocal()
+    try:
+        profile = s.get(DatasetProfile, report_id)
+        if not profile:
+            profile = DatasetProfile(report_id=report_id)
+            s.add(profile)
+        profile.status = "ready"
+        profile.dataset_version = version
+        profile.row_count, profile.column_count = row_count, column_count
+        profile.columns = columns
+        profile.error = None
+        profile.updated_at = datetime.datetime.now(datetime.timezone.utc)
+        s.query(Report).filter_by(id=report_id).update(
+            {"row_count": row_count, "column_count": column_count}, synchronize_session=False
+        )
+        s.commit()
+    except IntegrityError:
+        # Another session stored this report's profile first
+        s.rollback()
+    except Exception as e:
+        s.rollback()
+        print(f"[Catalog][Error] Failed to store the column catalog of report {report_id}: {e}")
+    finally:
+        s.close()
+
+
+def get_column_catalog(session, report):
+    """
+    Return the column catalog for report, reading it from dataset_profiles
+    when it matches the current dataset version and computing (and storing)
+    it otherwise. Returns None if the data cannot be loaded.
+    """
+    version = dataset_version(report.filepath)
+    profile = session.query(DatasetProfile).filter_by(report_id=report.id).first()
+    if _is_current(profile, version):
+        return profile.columns
+
+    df = load_dataset(artifact_key(report), report.filepath, report.filename)
+    if df is None:
+        return None
+    columns = profile_dataframe(df)
+    row_count, column_count = int(len(df)), int(len(df.columns))
+    _store_catalog(report.id, version, row_count, column_count, columns)
+    # Show the new counts without marking report as changed in the caller's session
+    set_committed_value(report, "row_count", row_count)
+    set_committed_value(report, "column_count", column_count)
+    if profile is not None:
+        session.expire(profile)
+    return columns
+
+
+def split_columns(catalog):
+    """Return (numeric_cols, categorical_cols) as the Chart Builder lists them."""
+    numeric_cols = [c["name"] for c in catalog if c["semantic_type"] == "numeric"]
+    categorical_cols = [c["name"] for c in catalog if c["semantic_type"] != "numeric"]
+    return numeric_cols, categorical_cols
+
+
+def column_stats(catalog, name):
+    return next((c for c in catalog if c["name"] == name), None)
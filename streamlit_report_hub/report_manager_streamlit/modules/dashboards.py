@@ -1,9 +1,21 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.io as pio
 from db import SessionLocal
 from models import Dashboard, Visualization, DashboardPermission, User, Group, Report, ReportPermission, group_members
 from .utils import safe_rerun
+from .dataset_cache import load_dataset, dataset_version
+from .file_metadata import artifact_key
+from .result_cache import make_cache_key, get_cached_result, put_cached_result, invalidate_visualization
+from .aggregation import aggregate_for_chart, default_aggregation, AGGREGATIONS, AGGREGATED_TYPES
+from .permissions import (
+    get_effective_permissions, granted_report_level, dashboard_level_allows,
+    bump_permission_version,
+)
+from .report_access import refresh_report_access, accessible_report_ids
+from .column_stats import get_column_catalog, split_columns, column_stats
+from .downsampling import downsample_for_chart, point_budget, DOWNSAMPLED_TYPES, WEBGL_THRESHOLD
 from streamlit_sortables import sort_items
 import uuid
 import json
@@ -17,24 +29,10 @@ def dashboards_builder(session, org_id, dashboard_id, user_id):
     """Sidebar builder for creating/editing visualizations (inspired by Looker Studio's data panel)."""
     st.sidebar.header("Chart Builder")
 
-    db_user = session.query(User).filter_by(id=user_id).first()
-    user_groups = [g.id for g in db_user.groups] if db_user else []
     reports = (
     session.query(Report)
-    .filter(
-        or_(
-            Report.owner_id == user_id,
-            Report.id.in_(
-                session.query(ReportPermission.report_id)
-                .filter(
-                    or_(
-                        ReportPermission.user_id == user_id,
-                        ReportPermission.group_id.in_(user_groups)
-                    )
-                )
-            )
-        )
-    ).all()
+    .filter(Report.id.in_(accessible_report_ids(session, user_id)))
+    .all()
 )
 
     if not reports:
@@ -76,28 +74,20 @@ def dashboards_builder(session, org_id, dashboard_id, user_id):
     
         
 
-    # Permission check for selected report
-    if not has_report_permission(session, report.id, user_id):
+    # Permission check for selected report (levels for the whole list come from one query)
+    levels = get_effective_permissions(session, {"id": user_id, "organization_id": org_id}, reports)
+    if not levels.get(report.id):
         st.sidebar.error("You do not have permission to use this report.")
         return
 
-    # Only reload df and columns if the report changes
-    if "chart_last_report_id" not in st.session_state or st.session_state["chart_last_report_id"] != report.id:
-        df = load_report_dataframe(session, report.id)
-        if df is None or df.empty:
-            st.sidebar.warning("Dataset is empty or could not be loaded.")
-            return
-        numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns.tolist()
-        categorical_cols = df.select_dtypes(include=["object", "category", "datetime64"]).columns.tolist()
-        all_cols = categorical_cols + numeric_cols
-        st.session_state["chart_last_report_id"] = report.id
-        st.session_state["chart_numeric_cols"] = numeric_cols
-        st.session_state["chart_categorical_cols"] = categorical_cols
-        st.session_state["chart_all_cols"] = all_cols
-    else:
-        numeric_cols = st.session_state.get("chart_numeric_cols", [])
-        categorical_cols = st.session_state.get("chart_categorical_cols", [])
-        all_cols = st.session_state.get("chart_all_cols", [])
+    # Columns and filter widgets come from the stored column catalog, not the data file
+    catalog = get_column_catalog(session, report)
+    if not catalog:
+        st.sidebar.warning("Dataset is empty or could not be loaded.")
+        return
+    numeric_cols, categorical_cols = split_columns(catalog)
+    all_cols = categorical_cols + numeric_cols
+    st.session_state["chart_last_report_id"] = report.id
 
     chart_type = st.sidebar.selectbox("Chart Type", ["Bar", "Line", "Pie", "Scatter", "Area", "Table"])
 
@@ -167,20 +157,35 @@ def dashboards_builder(session, org_id, dashboard_id, user_id):
             table_columns = sorted_containers[1]['items']
             config.update({"columns": table_columns})
 
+    # Aggregation applied before plotting
+    if chart_type in AGGREGATED_TYPES:
+        config["agg"] = st.sidebar.selectbox(
+            "Aggregation", AGGREGATIONS, index=AGGREGATIONS.index(default_aggregation(chart_type))
+        )
+    if chart_type in DOWNSAMPLED_TYPES:
+        config["point_budget"] = int(st.sidebar.number_input(
+            "Max points (larger data is downsampled)", min_value=100, value=point_budget({}), step=500))
+
     # Basic Filters
     st.sidebar.markdown("### Filters")
     filter_col = st.sidebar.selectbox("Filter Column", ["None"] + all_cols)
     if filter_col != "None":
+        stats = column_stats(catalog, filter_col)
         if filter_col in numeric_cols:
-            min_val, max_val = st.sidebar.slider(
-                f"Range for {filter_col}",
-                float(df[filter_col].min()),
-                float(df[filter_col].max()),
-                (float(df[filter_col].min()), float(df[filter_col].max()))
-            )
-            config["filters"][filter_col] = [min_val, max_val]
+            if stats["min"] is None or stats["min"] == stats["max"]:
+                st.sidebar.info(f"{filter_col} has no range to filter on.")
+            else:
+                min_val, max_val = st.sidebar.slider(
+                    f"Range for {filter_col}",
+                    float(stats["min"]),
+                    float(stats["max"]),
+                    (float(stats["min"]), float(stats["max"]))
+                )
+                config["filters"][filter_col] = [min_val, max_val]
         elif filter_col in categorical_cols:
-            options = df[filter_col].unique().tolist()
+            options = [v for v, _ in stats["top_values"]]
+            if stats["distinct_count"] > len(options):
+                st.sidebar.caption(f"Showing the {len(options)} most common of {stats['distinct_count']} values.")
             selected = st.sidebar.multiselect(f"Select values for {filter_col}", options, default=options[:5])
             config["filters"][filter_col] = selected
 
@@ -239,13 +244,19 @@ def dashboards_preview(session, dashboard_id):
             session.commit()
             safe_rerun()
 
-    # Render in 2-column grid
+    # Render in 2-column grid; all charts share one registry so each report loads once
+    registry = DatasetRegistry(session, user_id)
     cols = st.columns(2)
     for idx, viz in enumerate(visualizations):
         with cols[idx % 2]:
-            render_visualization(session, viz)
+            render_visualization(session, viz, registry)
             if can_edit:
-                edit_delete_viz(session, viz)
+                edit_delete_viz(session, viz, registry)
+    if registry.requests:
+        st.caption(
+            f"Datasets: {registry.loads} loaded for {registry.requests} requests "
+            f"({registry.deduplicated} loads deduplicated)"
+        )
 
 # -----------------------------
 # Share Dashboard
@@ -273,6 +284,7 @@ def share_dashboard(session, dashboard_id, user_id, selected_users, selected_gro
 
     # Remove any previous dashboard permissions for this dashboard
     session.query(DashboardPermission).filter_by(dashboard_id=dashboard_id).delete()
+    bump_permission_version(session)
 
     # Set new dashboard permissions
     new_user_ids = []
@@ -335,13 +347,15 @@ def share_dashboard(session, dashboard_id, user_id, selected_users, selected_gro
                     level="Viewer"
                 )
                 session.add(perm)
+    refresh_report_access(session, dashboard_reports)
+    bump_permission_version(session)
     session.commit()
 
 # -----------------------------
 # Helper: Check Dashboard Permission
 # -----------------------------
 def has_dashboard_permission(session, dashboard_id, user_id, required_level=None):
-    dashboard = session.query(Dashboard).filter_by(id=dashboard_id).first()
+    dashboard = session.get(Dashboard, dashboard_id)
     if not dashboard:
         return False
 
@@ -353,123 +367,171 @@ def has_dashboard_permission(session, dashboard_id, user_id, required_level=None
     if "user" in st.session_state and st.session_state.user.get("role_name") == "Admin":
         return True
 
-    db_user = session.query(User).filter_by(id=user_id).first()
-    user_groups = [g.id for g in db_user.groups] if db_user else []
-
-    perm = (
-        session.query(DashboardPermission)
-        .filter_by(dashboard_id=dashboard_id)
-        .filter(
-            or_(
-                DashboardPermission.user_id == user_id,
-                DashboardPermission.group_id.in_(user_groups)
-            )
-        )
-        .first()
-    )
-
-    if not perm:
-        return False
-
-    if required_level:
-        return perm.level == required_level
-    return True
+    # Direct or group grant, from the cached permission graph
+    return dashboard_level_allows(session, user_id, dashboard_id, required_level)
 
 # -----------------------------
 # Helper: Check Report Permission
 # -----------------------------
 def has_report_permission(session, report_id, user_id):
     """Check if user has at least 'Viewer' permission for the report (direct or group) or is owner."""
-    report = session.query(Report).filter_by(id=report_id).first()
+    report = session.get(Report, report_id)
     if not report:
         return False
     if report.owner_id == user_id:
         return True
-    db_user = session.query(User).filter_by(id=user_id).first()
-    user_groups = [g.id for g in db_user.groups] if db_user else []
-    perm = (
-        session.query(ReportPermission)
-        .filter_by(report_id=report_id)
-        .filter(
-            or_(
-                ReportPermission.user_id == user_id,
-                ReportPermission.group_id.in_(user_groups)
-            )
-        )
-        .first()
-    )
-    if perm:
-        return perm.level in ["Viewer", "Commenter", "Editor", "Owner"]
-    return False
+    return granted_report_level(session, user_id, report_id) is not None
 
 # -----------------------------
 # Render Single Visualization
 # -----------------------------
-def render_visualization(session, viz):
+def render_visualization(session, viz, registry=None):
+    if registry is None:
+        registry = DatasetRegistry(session, st.session_state.user["id"])
     config = json.loads(viz.data_config)
-    df = load_report_dataframe(session, config["report_id"])
-    if df is None:
+    report = registry.report(config["report_id"])
+    if report is None:
         st.warning(f"Data not found for {viz.title}")
         return
+    if not registry.allowed(report.id):
+        st.error("You do not have permission to view this report.")
+        return
 
-    # Apply filters
-    filters = config.get("filters", {})
+    # Reuse the last result while the config and the source dataset are unchanged
+    cache_key = make_cache_key(viz.id, viz.type, viz.data_config, dataset_version(report.filepath))
+    result = get_cached_result(cache_key)
+    if result is None:
+        df = registry.get(report.id)
+        if df is None:
+            st.warning(f"Data not found for {viz.title}")
+            return
+        result = build_visualization_result(viz.type, config, df)
+        put_cached_result(cache_key, result)
+
+    st.markdown(f"**{viz.title}** ({viz.type})")
+
+    if "figure" in result:
+        st.plotly_chart(pio.from_json(result["figure"]), use_container_width=True)
+        if result.get("note"):
+            st.caption(f"⚡ {result['note']}")
+    elif "table" in result:
+        st.dataframe(result["table"])
+
+def apply_filters(df, filters):
     for col, vals in filters.items():
         if col in df.columns:
-            if df[col].dtype in ["int64", "float64"]:
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
                 df = df[(df[col] >= vals[0]) & (df[col] <= vals[1])]
             else:
                 df = df[df[col].isin(vals)]
-
-    st.markdown(f"**{viz.title}** ({viz.type})")
-
-    if viz.type == "Bar":
+    return df
+
+def build_visualization_result(viz_type, config, df):
+    """Filter and aggregate df, then build the figure JSON (or table frame) for one visualization."""
+    df = apply_filters(df, config.get("filters", {}))
+    df = aggregate_for_chart(df, viz_type, config)
+    df, source_rows = downsample_for_chart(df, viz_type, config)
+    note = None
+    if len(df) < source_rows:
+        note = f"Downsampled from {source_rows:,} to {len(df):,} points"
+
+    if viz_type == "Bar":
         fig = px.bar(df, x=config.get("x"), y=config.get("y"), color=config.get("color"))
-        st.plotly_chart(fig, use_container_width=True)
-    elif viz.type == "Line":
+    elif viz_type == "Line":
         fig = px.line(df, x=config.get("x"), y=config.get("y"), color=config.get("color"))
-        st.plotly_chart(fig, use_container_width=True)
-    elif viz.type == "Scatter":
-        fig = px.scatter(df, x=config.get("x"), y=config.get("y"), color=config.get("color"))
-        st.plotly_chart(fig, use_container_width=True)
-    elif viz.type == "Area":
+    elif viz_type == "Scatter":
+        render_mode = "webgl" if source_rows > WEBGL_THRESHOLD else "svg"
+        fig = px.scatter(df, x=config.get("x"), y=config.get("y"), color=config.get("color"), render_mode=render_mode)
+    elif viz_type == "Area":
         fig = px.area(df, x=config.get("x"), y=config.get("y"), color=config.get("color"))
-        st.plotly_chart(fig, use_container_width=True)
-    elif viz.type == "Pie":
+    elif viz_type == "Pie":
         fig = px.pie(df, names=config.get("names"), values=config.get("values"))
-        st.plotly_chart(fig, use_container_width=True)
-    elif viz.type == "Table":
-        st.dataframe(df[config.get("columns", df.columns.tolist())])
+    elif viz_type == "Table":
+        return {"table": df[config.get("columns", df.columns.tolist())]}
+    else:
+        return {}
+    return {"figure": fig.to_json(), "note": note}
+
+# -----------------------------
+# Load DataFrame Helper
+# -----------------------------
+def read_report_dataframe(report):
+    """Load the report's data (no permission check)."""
+    try:
+        return load_dataset(artifact_key(report), report.filepath, report.filename)
+    except Exception as e:
+        st.error(f"Failed to load report data: {e}")
+        return None
 
 # -----------------------------
-# Load DataFrame Helper (with Permission Check)
+# Dataset Registry (one per dashboard render)
 # -----------------------------
-def load_report_dataframe(session, report_id):
-    report = session.query(Report).filter_by(id=report_id).first()
-    if report:
-        user_id = st.session_state.user["id"]
-        if not has_report_permission(session, report_id, user_id):
-            st.error("You do not have permission to view this report.")
+class DatasetRegistry:
+    """
+    Resolves each report (row, permission check and dataframe) at most once
+    per rerun and hands out shallow copies, so charts built on the same
+    report share one load. Callers must not modify the frames in place.
+    """
+
+    def __init__(self, session, user_id):
+        self.session = session
+        self.user_id = user_id
+        self._reports = {}
+        self._allowed = {}
+        self._frames = {}
+        self._catalogs = {}
+        self.requests = 0
+        self.loads = 0
+
+    @property
+    def deduplicated(self):
+        return self.requests - self.loads
+
+    def report(self, report_id):
+        if report_id not in self._reports:
+            self._reports[report_id] = self.session.query(Report).filter_by(id=report_id).first()
+        return self._reports[report_id]
+
+    def allowed(self, report_id):
+        if report_id not in self._allowed:
+            self._allowed[report_id] = has_report_permission(self.session, report_id, self.user_id)
+        return self._allowed[report_id]
+
+    def get(self, report_id):
+        """Return a view of the report's dataframe, or None if missing or not permitted."""
+        report = self.report(report_id)
+        if report is None or not self.allowed(report_id):
             return None
-        try:
-            if report.filename.endswith(".csv"):
-                return pd.read_csv(report.filepath)
-            elif report.filename.endswith(".xlsx"):
-                return pd.read_excel(report.filepath)
-        except Exception as e:
-            st.error(f"Failed to load report data: {e}")
+        self.requests += 1
+        if report_id not in self._frames:
+            self.loads += 1
+            self._frames[report_id] = read_report_dataframe(report)
+        df = self._frames[report_id]
+        return df.copy(deep=False) if df is not None else None
+
+    def catalog(self, report_id):
+        """Return the report's column catalog, or None if missing or not permitted."""
+        report = self.report(report_id)
+        if report is None or not self.allowed(report_id):
             return None
-    return None
+        if report_id not in self._catalogs:
+            try:
+                self._catalogs[report_id] = get_column_catalog(self.session, report)
+            except Exception as e:
+                st.error(f"Failed to load column statistics: {e}")
+                self._catalogs[report_id] = None
+        return self._catalogs[report_id]
 
 # -----------------------------
 # Edit/Delete Viz
 # -----------------------------
-def edit_delete_viz(session, viz):
+def edit_delete_viz(session, viz, registry=None):
+    if registry is None:
+        registry = DatasetRegistry(session, st.session_state.user["id"])
     with st.expander(f"Edit/Delete: {viz.title}"):
         config = json.loads(viz.data_config)
-        df = load_report_dataframe(session, config["report_id"])
-        numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns.tolist() if df is not None else []
-        categorical_cols = df.select_dtypes(include=["object", "category", "datetime64"]).columns.tolist() if df is not None else []
+        catalog = registry.catalog(config["report_id"]) or []
+        numeric_cols, categorical_cols = split_columns(catalog)
         all_cols = categorical_cols + numeric_cols
 
         new_title = st.text_input("Title", viz.title, key=f"edit_title_{viz.id}")
@@ -522,24 +584,41 @@ def edit_delete_viz(session, viz):
             sorted_containers = sort_items(initial_containers, multi_containers=True, key=f"edit_fields_{viz.id}_{new_type}")
             table_columns = sorted_containers[1]['items']
 
+        agg = config.get("agg") or default_aggregation(new_type)
+        if new_type in AGGREGATED_TYPES:
+            agg = st.selectbox("Aggregation", AGGREGATIONS,
+                               index=AGGREGATIONS.index(agg) if agg in AGGREGATIONS else 0,
+                               key=f"edit_agg_{viz.id}")
+        budget = point_budget(config)
+        if new_type in DOWNSAMPLED_TYPES:
+            budget = int(st.number_input("Max points (larger data is downsampled)", min_value=100, value=budget,
+                                         step=500, key=f"edit_budget_{viz.id}"))
+
         # Filters (simplified, can expand to match builder)
         st.markdown("**Filters**")
         filter_col = st.selectbox("Filter Column", ["None"] + all_cols, key=f"edit_filter_col_{viz.id}")
         if filter_col != "None":
+            stats = column_stats(catalog, filter_col)
             if filter_col in numeric_cols:
-                min_val, max_val = st.slider(
-                    f"Range for {filter_col}",
-                    float(df[filter_col].min()),
-                    float(df[filter_col].max()),
-                    (float(config["filters"].get(filter_col, [df[filter_col].min(), df[filter_col].max()])[0]),
-                     float(config["filters"].get(filter_col, [df[filter_col].min(), df[filter_col].max()])[1])),
-                    key=f"edit_filter_range_{viz.id}"
-                )
-                config["filters"][filter_col] = [min_val, max_val]
+                if stats["min"] is None or stats["min"] == stats["max"]:
+                    st.info(f"{filter_col} has no range to filter on.")
+                else:
+                    low, high = config["filters"].get(filter_col, [stats["min"], stats["max"]])
+                    min_val, max_val = st.slider(
+                        f"Range for {filter_col}",
+                        float(stats["min"]),
+                        float(stats["max"]),
+                        (float(low), float(high)),
+                        key=f"edit_filter_range_{viz.id}"
+                    )
+                    config["filters"][filter_col] = [min_val, max_val]
             elif filter_col in categorical_cols:
-                options = df[filter_col].unique().tolist()
+                options = [v for v, _ in stats["top_values"]]
+                # Keep previously selected values selectable even if they are not in the top list
+                current = config["filters"].get(filter_col, options[:5])
+                options += [v for v in current if v not in options]
                 selected = st.multiselect(f"Select values for {filter_col}", options,
-                                         default=config["filters"].get(filter_col, options[:5]),
+                                         default=current,
                                          key=f"edit_filter_values_{viz.id}")
                 config["filters"][filter_col] = selected
 
@@ -553,12 +632,17 @@ def edit_delete_viz(session, viz):
                 new_config.update({"names": x, "values": y})
             elif new_type == "Table":
                 new_config.update({"columns": table_columns})
+            if new_type in AGGREGATED_TYPES:
+                new_config["agg"] = agg
+            if new_type in DOWNSAMPLED_TYPES:
+                new_config["point_budget"] = budget
             viz.data_config = json.dumps(new_config)
             session.commit()
             st.success("Visualization updated!")
             safe_rerun()
 
         if st.button("Delete", key=f"delete_{viz.id}"):
+            invalidate_visualization(viz.id)
             session.delete(viz)
             session.commit()
             st.success("Visualization deleted!")
@@ -0,0 +1,86 @@
+import os
+import glob
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from .storage import get_storage
+
+# -------------------------
+# Dataset Cache Configuration
+# -------------------------
+# Parsed CSV/XLSX reports are stored once as uncompressed Feather (Arrow IPC)
+# files so later loads are memory-mapped instead of re-parsed.
+CACHE_DIR = os.getenv('DATASET_CACHE_DIR', os.path.join('uploads', '.dataset_cache'))
+
+
+def dataset_version(filepath):
+    """Return a version string for the stored source file, or None if it is missing."""
+    return get_storage().version(filepath)
+
+
+def _cache_path(report_id, version):
+    return os.path.join(CACHE_DIR, f"{report_id}_{version}.feather")
+
+
+def read_source_file(filepath, filename=None):
+    """Parse the raw CSV/XLSX file. Returns None for unsupported types."""
+    name = (filename or filepath).lower()
+    if name.endswith(".csv"):
+        return pd.read_csv(get_storage().local_path(filepath))
+    elif name.endswith(".xlsx") or name.endswith(".xls"):
+        return pd.read_excel(get_storage().local_path(filepath))
+    return None
+
+
+def write_cache_entry(report_id, version, df):
+    """Write df as the cached copy for (report_id, version). Returns True on success."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(report_id, version)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        # Mixed-type object columns cannot always be converted to Arrow;
+        # those datasets are simply served from the source file.
+        print(f"[Cache][Warn] Could not cache dataset {report_id}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def load_dataset(report_id, filepath, filename=None):
+    """
+    Return the report's DataFrame, served from the columnar cache when a
+    fresh entry exists, otherwise parsed from the source and cached.
+    """
+    version = dataset_version(filepath)
+    if version is None:
+        raise FileNotFoundError(filepath)
+
+    path = _cache_path(report_id, version)
+    if os.path.exists(path):
+        try:
+            return feather.read_table(path, memory_map=True).to_pandas()
+        except Exception as e:
+            print(f"[Cache][Warn] Corrupt cache entry {path}: {e}")
+            os.remove(path)
+
+    df = read_source_file(filepath, filename)
+    if df is None:
+        return None
+    # Drop entries for older versions before writing the new one
+    invalidate_dataset(report_id)
+    write_cache_entry(report_id, version, df)
+    return df
+
+
+def invalidate_dataset(report_id):
+    """Remove every cached entry for report_id."""
+    for path in glob.glob(os.path.join(CACHE_DIR, f"{glob.escape(report_id)}_*.feather")):
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"[Cache][Warn] Failed to remove {path}: {e}")
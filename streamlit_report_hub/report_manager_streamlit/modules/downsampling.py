@@ -0,0 +1,118 @@
+import os
+import numpy as np
+import pandas as pd
+
+# -------------------------
+# Chart Downsampling
+# -------------------------
+# Line/Area charts above the point budget are reduced with LTTB
+# (Largest-Triangle-Three-Buckets), scatter plots with grid-bin sampling.
+DEFAULT_POINT_BUDGET = int(os.getenv('CHART_POINT_BUDGET', '5000'))
+# Scatter plots with more source rows than this are drawn with WebGL traces
+WEBGL_THRESHOLD = int(os.getenv('CHART_WEBGL_THRESHOLD', '1000'))
+DOWNSAMPLED_TYPES = ["Line", "Area", "Scatter"]
+
+
+def point_budget(config):
+    try:
+        return max(int(config.get("point_budget") or DEFAULT_POINT_BUDGET), 10)
+    except (TypeError, ValueError):
+        return DEFAULT_POINT_BUDGET
+
+
+def _as_float(series):
+    """Numeric view of an axis: datetimes as ints, anything else by position."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype("int64").to_numpy(dtype=float)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=float)
+    return np.arange(len(series), dtype=float)
+
+
+def lttb_indices(x, y, n_out):
+    """Return the positions LTTB keeps when reducing (x, y) to n_out points."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        if i + 2 < len(edges):
+            avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        bx, by = x[start:end], y[start:end]
+        areas = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.nanargmax(areas)) if np.isfinite(areas).any() else start
+        keep[i + 1] = a
+    return keep
+
+
+def _grid_bins(values, bins):
+    """Bucket values into 0..bins-1 across their range; NaNs go to bucket `bins`."""
+    finite = np.isfinite(values)
+    if not finite.any():
+        return np.full(len(values), bins, dtype=np.int64)
+    lo, hi = values[finite].min(), values[finite].max()
+    span = (hi - lo) or 1.0
+    cells = np.full(len(values), bins, dtype=np.int64)
+    cells[finite] = np.minimum(((values[finite] - lo) / span * bins).astype(np.int64), bins - 1)
+    return cells
+
+
+def bin_sample(x, y, n_out):
+    """Keep one point per occupied cell of a grid over (x, y), sized to roughly n_out cells."""
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    bins = max(int(np.sqrt(n_out)), 1)
+    cells = _grid_bins(x, bins) * (bins + 1) + _grid_bins(y, bins)
+    _, keep = np.unique(cells, return_index=True)
+    if len(keep) < n_out:
+        # Top up with an even stride so dense regions stay visibly dense
+        taken = np.zeros(n, dtype=bool)
+        taken[keep] = True
+        extra = np.flatnonzero(~taken)
+        step = max(len(extra) // (n_out - len(keep)), 1)
+        keep = np.concatenate([keep, extra[::step][: n_out - len(keep)]])
+    return np.sort(keep[:n_out])
+
+
+def _reduce_group(group, viz_type, x_col, y_col, n_out):
+    if viz_type == "Scatter":
+        positions = bin_sample(_as_float(group[x_col]), _as_float(group[y_col]), n_out)
+        return group.iloc[positions]
+    group = group.sort_values(x_col, kind="stable")
+    y = _as_float(group[y_col])
+    if not pd.api.types.is_numeric_dtype(group[y_col]):
+        return group.iloc[np.linspace(0, len(group) - 1, n_out).astype(int)]
+    return group.iloc[lttb_indices(_as_float(group[x_col]), y, n_out)]
+
+
+def downsample_for_chart(df, viz_type, config):
+    """
+    Reduce df to the chart's point budget. Returns (df, original_row_count);
+    df is returned unchanged when it is already within budget.
+    """
+    original = len(df)
+    budget = point_budget(config)
+    x_col, y_col, color = config.get("x"), config.get("y"), config.get("color")
+    if viz_type not in DOWNSAMPLED_TYPES or original <= budget:
+        return df, original
+    if not x_col or not y_col or x_col not in df.columns or y_col not in df.columns:
+        return df, original
+
+    if color and color in df.columns:
+        # Split the budget between series in proportion to their size
+        parts = []
+        for _, group in df.groupby(color, sort=False, observed=True, dropna=False):
+            share = max(int(budget * len(group) / original), 3)
+            parts.append(_reduce_group(group, viz_type, x_col, y_col, share))
+        return pd.concat(parts), original
+    return _reduce_group(df, viz_type, x_col, y_col, budget), original
@@ -0,0 +1,160 @@
+import os
+import re
+import hashlib
+import tempfile
+import mimetypes
+from .storage import get_storage
+
+# -------------------------
+# Report File Metadata
+# -------------------------
+# Size, hash, MIME type and page/row/column counts are captured when a file
+# is written and stored on the Report row, so listings never stat the file.
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_stream(source, filepath, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Copy the binary file-like `source` to filepath in fixed-size chunks,
+    hashing as it goes. The data is written to a temp file in the target
+    directory, fsynced and renamed into place, so filepath is either absent
+    or complete. Returns (size_bytes, sha256 hex digest).
+    """
+    directory = os.path.dirname(filepath) or '.'
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: source.read(chunk_size), b''):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, filepath)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        # Persist the rename itself
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return size, digest.hexdigest()
+
+
+def count_pdf_pages(filepath):
+    """Return the PDF's page count (pypdf when installed, else a /Type /Page scan)."""
+    try:
+        from pypdf import PdfReader
+        return len(PdfReader(filepath).pages)
+    except ImportError:
+        pass
+    except Exception as e:
+        print(f"[Metadata][Warn] pypdf could not read {filepath}: {e}")
+    with open(filepath, 'rb') as f:
+        return len(re.findall(rb"/Type\s*/Page(?![a-zA-Z])", f.read()))
+
+
+def file_extension(filename):
+    """Lowercased extension without the dot ("" -> None), as stored in reports.file_ext."""
+    return os.path.splitext(filename)[1].lstrip('.').lower() or None
+
+
+def compute_file_metadata(filepath, filename, mime_type=None, content_hash=None):
+    """
+    Return the file-level metadata columns for a stored report file. Pass
+    content_hash when it is already known (write_stream) to skip re-reading.
+    """
+    filepath = get_storage().local_path(filepath)
+    meta = {
+        "file_ext": file_extension(filename),
+        "size_bytes": os.path.getsize(filepath),
+        "content_hash": content_hash or sha256_file(filepath),
+        "mime_type": mime_type or mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        "page_count": None,
+    }
+    if filename.lower().endswith(".pdf"):
+        try:
+            meta["page_count"] = count_pdf_pages(filepath)
+        except Exception as e:
+            print(f"[Metadata][Warn] Could not count pages of {filepath}: {e}")
+    return meta
+
+
+def artifact_key(report):
+    """
+    Key for a report's derived artifacts (columnar cache, PDF thumbnail):
+    its content hash, so reports sharing a blob share them.
+    """
+    return report.content_hash or report.id
+
+
+def apply_file_metadata(report, meta):
+    for key, value in meta.items():
+        setattr(report, key, value)
+
+
+def format_size(size_bytes):
+    """Human-readable size for report cards ("—" when unknown)."""
+    if size_bytes is None:
+        return "—"
+    size = size_bytes / 1024
+    return f"{size:.1f} KB" if size < 1024 else f"{size/1024:.1f} MB"
+
+
+# -------------------------
+# Backfill for existing rows
+# -------------------------
+def backfill_report_metadata(force=False):
+    """
+    Fill metadata for reports uploaded before it was tracked.
+    Run from the app directory: python -m modules.file_metadata [--force]
+    """
+    from sqlalchemy import or_
+    from db import SessionLocal
+    from models import Report
+    from .dataset_cache import load_dataset
+
+    s = SessionLocal()
+    updated = failed = 0
+    try:
+        query = s.query(Report)
+        if not force:
+            query = query.filter(or_(Report.size_bytes.is_(None), Report.file_ext.is_(None)))
+        for r in query.all():
+            try:
+                apply_file_metadata(r, compute_file_metadata(r.filepath, r.filename))
+                if r.profile and r.profile.status == "ready":
+                    r.row_count, r.column_count = r.profile.row_count, r.profile.column_count
+                else:
+                    df = load_dataset(artifact_key(r), r.filepath, r.filename)
+                    if df is not None:
+                        r.row_count, r.column_count = len(df), len(df.columns)
+                s.commit()
+                updated += 1
+            except Exception as e:
+                s.rollback()
+                failed += 1
+                print(f"[Metadata][Error] Report {r.id} ({r.filepath}): {e}")
+    finally:
+        s.close()
+    print(f"[Metadata] Backfilled {updated} report(s), {failed} failed.")
+    return updated, failed
+
+
+if __name__ == "__main__":
+    import sys
+    backfill_report_metadata(force="--force" in sys.argv)
@@ -1,11 +1,13 @@
 import streamlit as st
-from db import SessionLocal
+from db import get_session, release_session
 from models import Group, User
 from .utils import safe_rerun
+from .permissions import bump_permission_version
+from .report_access import refresh_user_access
 
 def group_management_page():
     st.header("👥 Groups Management")
-    s = SessionLocal()
+    s = get_session()
     try:
         org_id = st.session_state.user.get("organization_id")
         role = st.session_state.user.get("role_name")
@@ -55,13 +57,13 @@ def group_management_page():
             manage_group_members(st.session_state.selected_group_id)
 
     finally:
-        s.close()
+        release_session(s)
 
 
 def manage_group_members(group_id):
     """Admins assign users from their organization to this group."""
     st.subheader("🛠️ Manage Group Members")
-    s = SessionLocal()
+    s = get_session()
     try:
         group = s.query(Group).filter_by(id=group_id).first()
         if not group:
@@ -82,19 +84,23 @@ def manage_group_members(group_id):
         )
 
         if st.button("💾 Save Members"):
+            changed = {u.id for u in group.users}
             group.users = [user_options[name] for name in selected]
+            changed.update(u.id for u in group.users)
+            refresh_user_access(s, changed)
+            bump_permission_version(s)
             s.commit()
             st.success("Members updated successfully! ✅")
             safe_rerun()
 
     finally:
-        s.close()
+        release_session(s)
 
 
 @st.cache_data
 def get_users_in_org(org_id):
-    s = SessionLocal()
+    s = get_session()
     try:
         return s.query(User).filter_by(organization_id=org_id).all()
     finally:
-        s.close()
+        release_session(s)
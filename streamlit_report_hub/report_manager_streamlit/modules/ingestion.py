@@ -0,0 +1,203 @@
+import os
+import datetime
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from db import SessionLocal
+from models import Report, DatasetProfile
+from .dataset_cache import dataset_version, read_source_file, write_cache_entry, invalidate_dataset
+from .column_stats import profile_dataframe
+from .file_metadata import artifact_key
+from .search_index import index_report
+from .pdf_preview import generate_thumbnail
+
+# -------------------------
+# Ingestion Pipeline Configuration
+# -------------------------
+# Structured uploads are parsed, cached and profiled in a worker process pool
+# so the Streamlit script thread only writes the file and returns. PDFs go
+# through the same pool to have their text extracted for search and their
+# first-page thumbnail rendered.
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '2'))
+INGESTIBLE_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+DOCUMENT_EXTENSIONS = ('.pdf',)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def is_ingestible(filename):
+    return filename.lower().endswith(INGESTIBLE_EXTENSIONS)
+
+
+def is_document(filename):
+    return filename.lower().endswith(DOCUMENT_EXTENSIONS)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: the Streamlit server is multi-threaded, so forking it is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=INGEST_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def _submit(fn, report_id):
+    """Hand fn(report_id) to the worker pool. Returns False if it could not be queued."""
+    for attempt in range(2):
+        try:
+            _get_executor().submit(fn, report_id)
+            return True
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool and try once more
+            _reset_executor()
+        except Exception as e:
+            print(f"[Ingest][Error] Failed to queue report {report_id}: {e}")
+            break
+    return False
+
+
+def enqueue_ingestion(session, report_id):
+    """
+    Mark the report's profile as pending and hand it to the worker pool, or
+    for a PDF queue its text extraction. Returns immediately; the worker
+    updates the profile (or the search document) when it finishes.
+    """
+    report = session.query(Report).filter_by(id=report_id).first()
+    if not report:
+        return
+    if is_document(report.filename):
+        _submit(ingest_document, report_id)
+        return
+    if not is_ingestible(report.filename):
+        return
+
+    profile = session.query(DatasetProfile).filter_by(report_id=report_id).first()
+    if not profile:
+        profile = DatasetProfile(report_id=report_id)
+        session.add(profile)
+    if _reuse_profile(session, report, profile):
+        return
+    profile.status = "pending"
+    profile.error = None
+    profile.updated_at = datetime.datetime.now(datetime.timezone.utc)
+    session.commit()
+
+    if _submit(ingest_report, report_id):
+        return
+    profile.status = "failed"
+    profile.error = "Could not start ingestion worker"
+    session.commit()
+
+
+def _reuse_profile(session, report, profile):
+    """
+    Copy the ready profile of another report with the same content (a shared
+    blob) instead of parsing the file again. Returns True if one was found.
+    """
+    if not report.content_hash:
+        return False
+    version = dataset_version(report.filepath)
+    source = (
+        session.query(DatasetProfile)
+        .join(Report, Report.id == DatasetProfile.report_id)
+        .filter(
+            Report.content_hash == report.content_hash,
+            Report.id != report.id,
+            DatasetProfile.status == "ready",
+            DatasetProfile.dataset_version == version,
+        )
+        .first()
+    )
+    if source is None:
+        return False
+    for field in ("status", "dataset_version", "row_count", "column_count", "columns"):
+        setattr(profile, field, getattr(source, field))
+    profile.error = None
+    profile.updated_at = datetime.datetime.now(datetime.timezone.utc)
+    report.row_count, report.column_count = source.row_count, source.column_count
+    session.commit()
+    index_report(session, report, columns=[c["name"] for c in source.columns or []])
+    return True
+
+
+# -------------------------
+# Worker side
+# -------------------------
+def _set_status(session, report_id, **fields):
+    profile = session.query(DatasetProfile).filter_by(report_id=report_id).first()
+    if not profile:
+        profile = DatasetProfile(report_id=report_id)
+        session.add(profile)
+    for key, value in fields.items():
+        setattr(profile, key, value)
+    profile.updated_at = datetime.datetime.now(datetime.timezone.utc)
+    session.commit()
+
+
+def ingest_report(report_id):
+    """Parse, cache and profile one report. Runs inside a worker process."""
+    session = SessionLocal()
+    try:
+        report = session.query(Report).filter_by(id=report_id).first()
+        if not report:
+            return
+        _set_status(session, report_id, status="processing")
+
+        version = dataset_version(report.filepath)
+        if version is None:
+            raise FileNotFoundError(report.filepath)
+        df = read_source_file(report.filepath, report.filename)
+        if df is None:
+            raise ValueError(f"Unsupported file type: {report.filename}")
+
+        cache_key = artifact_key(report)
+        invalidate_dataset(cache_key)
+        write_cache_entry(cache_key, version, df)
+
+        report.row_count, report.column_count = int(len(df)), int(len(df.columns))
+        _set_status(
+            session, report_id,
+            status="ready",
+            dataset_version=version,
+            row_count=int(len(df)),
+            column_count=int(len(df.columns)),
+            columns=profile_dataframe(df),
+            error=None,
+        )
+        index_report(session, report, columns=list(df.columns))
+    except Exception as e:
+        session.rollback()
+        print(f"[Ingest][Error] Report {report_id}: {e}")
+        try:
+            _set_status(session, report_id, status="failed", error=str(e))
+        except Exception:
+            session.rollback()
+    finally:
+        session.close()
+
+
+def ingest_document(report_id):
+    """Render a PDF report's thumbnail and index its text. Runs inside a worker process."""
+    session = SessionLocal()
+    try:
+        report = session.query(Report).filter_by(id=report_id).first()
+        if report:
+            generate_thumbnail(report)
+            index_report(session, report, extract_text=True)
+    except Exception as e:
+        session.rollback()
+        print(f"[Ingest][Error] Report {report_id}: {e}")
+    finally:
+        session.close()
@@ -0,0 +1,117 @@
+import os
+import time
+import datetime
+import threading
+from collections import OrderedDict
+from sqlalchemy import select, func, case, true
+from models import Organization, User, Role, Report, Group, OrgActivityDaily
+from .activity import COUNTERS, prepare_activity_rollups
+
+# -------------------------
+# Home Page Metrics
+# -------------------------
+# The counters on the home and organization pages (totals plus this week /
+# this month) come from one SELECT joining single-row aggregates with
+# conditional sums, so a page load costs a single round trip. Reports,
+# users, dashboards and comments are summed from the daily rollups in
+# org_activity_daily (modules/activity.py), one row per organization per
+# day (every organization's rows for the whole system); groups, admins,
+# organizations and a user's own reports are counted directly. Results are
+# kept per scope (an organization, a user's own reports, or the whole system)
+# for METRICS_TTL seconds; new rows show up once the entry expires.
+METRICS_TTL = float(os.getenv('METRICS_TTL', '30'))
+METRICS_CACHE_SIZE = int(os.getenv('METRICS_CACHE_SIZE', '10000'))
+
+_entries = OrderedDict()  # (org_id, owner_id) -> (expires_at, metrics)
+_lock = threading.Lock()
+
+
+def period_starts(now=None):
+    """
+    Start of the current week (Monday 00:00) and month as naive UTC datetimes,
+    the clock created_at and the daily rollups use.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - datetime.timedelta(days=today.weekday()), today.replace(day=1)
+
+
+def _counts(name, model, condition, week_start, month_start):
+    """Single-row subquery: <name>, <name>_this_week and <name>_this_month."""
+    created = model.created_at
+    return select(
+        func.count().label(name),
+        func.sum(case((created >= week_start, 1), else_=0)).label(f"{name}_this_week"),
+        func.sum(case((created >= month_start, 1), else_=0)).label(f"{name}_this_month"),
+    ).select_from(model).where(condition).subquery()
+
+
+def _rollup_counts(org_id, week_start, month_start):
+    """The same columns for every counter of org_activity_daily, from one scan of the scope's days."""
+    day = OrgActivityDaily.day
+    columns = []
+    for name in COUNTERS:
+        count = getattr(OrgActivityDaily, name)
+        columns += [
+            func.sum(count).label(name),
+            func.sum(case((day >= week_start.date(), count), else_=0)).label(f"{name}_this_week"),
+            func.sum(case((day >= month_start.date(), count), else_=0)).label(f"{name}_this_month"),
+        ]
+    query = select(*columns)
+    if org_id:
+        query = query.where(OrgActivityDaily.organization_id == org_id)
+    return query.subquery()
+
+
+def _metrics_query(org_id, owner_id, week_start, month_start):
+    in_org = (lambda model: model.organization_id == org_id) if org_id else (lambda model: true())
+    admin_role = select(Role.id).where(Role.name == "Admin").scalar_subquery()
+    parts = [
+        _rollup_counts(org_id, week_start, month_start),
+        _counts("admins", User, in_org(User) & (User.role_id == admin_role), week_start, month_start),
+        _counts("groups", Group, in_org(Group), week_start, month_start),
+    ]
+    if owner_id:
+        parts.append(_counts("my_reports", Report, Report.owner_id == owner_id, week_start, month_start))
+    if not org_id:
+        parts.append(_counts("organizations", Organization, true(), week_start, month_start))
+    # Every part is one row, so joining them yields the single result row
+    joined = parts[0]
+    for part in parts[1:]:
+        joined = joined.join(part, true())
+    return select(*[column for part in parts for column in part.c]).select_from(joined)
+
+
+def _load_metrics(session, org_id, owner_id):
+    prepare_activity_rollups()
+    week_start, month_start = period_starts()
+    row = session.execute(_metrics_query(org_id, owner_id, week_start, month_start)).one()
+    return {name: int(value or 0) for name, value in row._mapping.items()}
+
+
+def get_metrics(session, org_id=None, owner_id=None):
+    """
+    Counters for org_id (the whole system when None), plus the reports owned
+    by owner_id when given. Returns a dict with "<name>", "<name>_this_week"
+    and "<name>_this_month" for reports, users, dashboards, comments, admins,
+    groups, my_reports (with owner_id) and organizations (without org_id).
+    """
+    key = (org_id, owner_id)
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] > now:
+            _entries.move_to_end(key)
+            return entry[1]
+    metrics = _load_metrics(session, org_id, owner_id)
+    with _lock:
+        _entries[key] = (now + METRICS_TTL, metrics)
+        _entries.move_to_end(key)
+        while len(_entries) > METRICS_CACHE_SIZE:
+            _entries.popitem(last=False)
+    return metrics
+
+
+def clear_metrics_cache():
+    with _lock:
+        _entries.clear()
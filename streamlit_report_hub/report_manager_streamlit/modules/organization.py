@@ -1,12 +1,15 @@
 import streamlit as st
-from db import SessionLocal
+from db import get_session, release_session
 from models import Organization, User, Role, Report, Group
 from .utils import safe_rerun
 
 import streamlit as st
-from db import SessionLocal
-from models import Organization, User, Role, Report, Group
+from db import get_session, release_session
+from models import Organization, User, Role, Report, Group, ReportPermission, DashboardPermission, Dashboard, Comment
 from .utils import safe_rerun
+from .permissions import bump_permission_version
+from .metrics import get_metrics
+from .blob_store import release_report_files
 
 def my_organization_page():
     """Admin view for their organization details and metrics."""
@@ -34,7 +37,7 @@ def my_organization_page():
         st.error("You are not assigned to an organization yet.")
         return
 
-    s = SessionLocal()
+    s = get_session()
     try:
         org = s.query(Organization).filter_by(id=org_id).first()
         if not org:
@@ -50,10 +53,11 @@ def my_organization_page():
         """, unsafe_allow_html=True)
 
         # Metrics with icons
-        total_users = s.query(User).filter_by(organization_id=org_id).count()
-        total_admins = s.query(User).filter_by(organization_id=org_id).join(User.role).filter(Role.name=="Admin").count()
-        total_reports = s.query(Report).filter_by(organization_id=org_id).count()
-        total_groups = s.query(Group).filter_by(organization_id=org_id).count()
+        metrics = get_metrics(s, org_id)
+        total_users = metrics["users"]
+        total_admins = metrics["admins"]
+        total_reports = metrics["reports"]
+        total_groups = metrics["groups"]
 
         col1, col2, col3, col4 = st.columns(4)
         with col1:
@@ -158,7 +162,7 @@ def my_organization_page():
             st.info("No reports uploaded yet.")
 
     finally:
-        s.close()
+        release_session(s)
 
 
 
@@ -168,7 +172,7 @@ def my_organization_page():
 
 def update_user_role(user_id):
     """Update user role when changed from selectbox"""
-    s = SessionLocal()
+    s = get_session()
     try:
         new_role_name = st.session_state[f"role_{user_id}"]
         user = s.query(User).filter_by(id=user_id).first()
@@ -189,12 +193,12 @@ def update_user_role(user_id):
             s.commit()
             st.success(f"Role updated to {new_role_name}")
     finally:
-        s.close()
+        release_session(s)
 
 
 def edit_user(user_id):
     """Edit user information"""
-    s = SessionLocal()
+    s = get_session()
     try:
         user = s.query(User).filter_by(id=user_id).first()
         if not user:
@@ -212,19 +216,43 @@ def edit_user(user_id):
                 st.success("User information updated!")
                 safe_rerun()
     finally:
-        s.close()
+        release_session(s)
+
+
+def remove_user_dependents(s, user):
+    """
+    Clear the rows that reference user so deleting it passes the foreign key
+    checks (the caller deletes the user and commits). Their report and
+    dashboard grants and their comments go, dashboards they created stay with
+    the organization, and the files of the reports they own (which go with
+    them) are released. Comments are deleted through the ORM so the activity
+    rollups count them.
+    """
+    release_report_files(s, user.reports)
+    s.query(ReportPermission).filter_by(user_id=user.id).delete()
+    s.query(DashboardPermission).filter_by(user_id=user.id).delete()
+    s.query(Dashboard).filter_by(created_by_id=user.id).update({Dashboard.created_by_id: None})
+    for comment in s.query(Comment).filter_by(user_id=user.id).all():
+        s.delete(comment)
 
 
 def delete_user(user_id):
     """Delete a user"""
-    s = SessionLocal()
+    s = get_session()
     try:
         user = s.query(User).filter_by(id=user_id).first()
         if not user:
             st.error("User not found.")
             return
-        s.delete(user)
-        s.commit()
-        st.success("User deleted successfully! 🗑️")
+        try:
+            remove_user_dependents(s, user)
+            s.delete(user)
+            bump_permission_version(s)
+            s.commit()
+            st.success("User deleted successfully! 🗑️")
+        except Exception as e:
+            s.rollback()
+            print(f"[Organization][Error] Failed to delete user {user_id}: {e}")
+            st.error(f"Failed to delete user: {e}")
     finally:
-        s.close()
+        release_session(s)
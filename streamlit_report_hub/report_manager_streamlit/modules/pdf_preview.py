@@ -0,0 +1,171 @@
+import os
+import shutil
+import importlib.util
+import streamlit as st
+from .file_metadata import artifact_key
+from .storage import get_storage
+
+# -------------------------
+# PDF Previews
+# -------------------------
+# A PDF only reaches a browser through the report card, after the report's
+# permission check: st.pdf (the streamlit[pdf] extra) shows it inline,
+# otherwise a download button offers it. Either way Streamlit serves the
+# bytes from its per-session media store, so nothing stays reachable once
+# the session moves on or the user loses access. Inline PDFs are read once
+# per content version into a small process-wide cache (PDF_CACHE_ENTRIES)
+# rather than on every rerun of an open card; downloads read the file only
+# when clicked. First-page thumbnails are rendered by the ingestion workers
+# (modules/ingestion.py) into THUMBNAIL_DIR, keyed by content hash like the
+# dataset cache, and shown with st.image; cards show the file icon until one
+# exists.
+# Render missing thumbnails: python -m modules.pdf_preview
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THUMBNAIL_DIR = os.getenv('THUMBNAIL_DIR', os.path.join('uploads', '.thumbnails'))
+THUMBNAIL_WIDTH = 160
+MAX_INLINE_PDF_SIZE = int(os.getenv('MAX_INLINE_PDF_SIZE', str(50 * 1024 * 1024)))
+PDF_CACHE_ENTRIES = int(os.getenv('PDF_CACHE_ENTRIES', '8'))
+# Earlier releases published PDFs and thumbnails under static/ for Streamlit's
+# unauthenticated static route
+LEGACY_PUBLISHED = [
+    os.path.join(APP_DIR, 'static', 'pdf'),
+    os.path.join(APP_DIR, 'static', 'thumbs'),
+    os.path.join(APP_DIR, 'uploads', '.static_secret'),
+]
+
+_pdf_viewer = None
+
+
+def pdf_viewer_available():
+    global _pdf_viewer
+    if _pdf_viewer is None:
+        _pdf_viewer = importlib.util.find_spec("streamlit_pdf") is not None
+    return _pdf_viewer
+
+
+def _read_file(filepath):
+    with get_storage().open(filepath) as f:
+        return f.read()
+
+
+@st.cache_resource(max_entries=PDF_CACHE_ENTRIES, show_spinner=False)
+def _pdf_bytes(key, filepath):
+    """The PDF's bytes, keyed by content hash so an edited file is read again."""
+    return _read_file(filepath)
+
+
+def file_download(filepath):
+    """st.download_button data that reads filepath only when the button is clicked."""
+    return lambda: _read_file(filepath)
+
+
+def show_pdf(report, key=None):
+    """Show report's PDF inline when possible, else as a download. Call only after the permission check."""
+    inline = pdf_viewer_available() and (
+        (report.size_bytes or get_storage().size(report.filepath)) <= MAX_INLINE_PDF_SIZE
+    )
+    if inline:
+        st.pdf(_pdf_bytes(artifact_key(report), report.filepath), height=600, key=key)
+        return
+    st.info("Inline preview is unavailable for this PDF.")
+    st.download_button(
+        label="Download PDF",
+        data=file_download(report.filepath),
+        file_name=report.filename,
+        mime="application/pdf",
+        key=f"download_{key}" if key else None,
+    )
+
+
+# -------------------------
+# Thumbnails
+# -------------------------
+def thumbnail_path(key):
+    return os.path.join(THUMBNAIL_DIR, f"{key}.png")
+
+
+def render_pdf_thumbnail(filepath, dest, width=THUMBNAIL_WIDTH):
+    """Render the first page of a PDF to a PNG (requires pypdfium2)."""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(filepath)
+    try:
+        page = pdf[0]
+        image = page.render(scale=width / page.get_width()).to_pil()
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        image.save(tmp, format="PNG", optimize=True)
+        os.replace(tmp, dest)
+    finally:
+        pdf.close()
+
+
+def generate_thumbnail(report):
+    """Render report's thumbnail unless it exists. Returns False if it could not be rendered."""
+    dest = thumbnail_path(artifact_key(report))
+    if os.path.exists(dest):
+        return True
+    try:
+        render_pdf_thumbnail(get_storage().local_path(report.filepath), dest)
+        return True
+    except ImportError:
+        return False
+    except Exception as e:
+        print(f"[Thumbnail][Warn] Could not render thumbnail for {report.filepath}: {e}")
+        return False
+
+
+def report_thumbnail(report):
+    """Path of report's thumbnail, or None while it has not been rendered."""
+    path = thumbnail_path(artifact_key(report))
+    return path if os.path.exists(path) else None
+
+
+def remove_thumbnail(key):
+    path = thumbnail_path(key)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def remove_published_copies():
+    """Delete the static/ copies left by earlier releases. Returns True if any were found."""
+    found = False
+    for path in LEGACY_PUBLISHED:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+        else:
+            continue
+        found = True
+        print(f"[Thumbnail] Removed {path} (published by an earlier release).")
+    return found
+
+
+def generate_missing_thumbnails():
+    """
+    Render the thumbnail of every PDF report that has none.
+    Run from the app directory: python -m modules.pdf_preview
+    """
+    from db import SessionLocal
+    from models import Report
+
+    remove_published_copies()
+    s = SessionLocal()
+    rendered = failed = 0
+    try:
+        for report in s.query(Report).filter(Report.file_ext == "pdf").all():
+            if report_thumbnail(report):
+                continue
+            if generate_thumbnail(report):
+                rendered += 1
+            else:
+                failed += 1
+    finally:
+        s.close()
+    print(f"[Thumbnail] Rendered {rendered} thumbnail(s), {failed} failed.")
+    return rendered, failed
+
+
+if __name__ == "__main__":
+    generate_missing_thumbnails()
@@ -0,0 +1,182 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy import or_, func, case, event
+from sqlalchemy.orm import Session
+from models import UserReportAccess, DashboardPermission, PermissionVersion, group_members
+
+# -------------------------
+# Report Permission Resolution
+# -------------------------
+LEVEL_ORDER = {"Viewer": 1, "Commenter": 2, "Editor": 3, "Owner": 4}
+LEVEL_BY_RANK = {rank: level for level, rank in LEVEL_ORDER.items()}
+DASHBOARD_LEVEL_ORDER = {"Viewer": 1, "Editor": 2}
+
+# -------------------------
+# Permission Graph Cache
+# -------------------------
+# Each user's groups, their rows of the materialized user_report_access table
+# (modules/report_access.py) and the dashboard ACL entries granted to the user
+# or those groups are loaded once and kept in memory, so permission checks are
+# dictionary lookups. Every write that changes ACL entries or group membership
+# calls bump_permission_version(session) before committing; the commit clears
+# this process's cache, and other server processes notice the new value in
+# the permission_versions table within PERMISSION_VERSION_TTL seconds.
+PERMISSION_VERSION_TTL = float(os.getenv('PERMISSION_VERSION_TTL', '2'))
+PERMISSION_CACHE_SIZE = int(os.getenv('PERMISSION_CACHE_SIZE', '10000'))
+VERSION_SCOPE = "acl"
+
+
+class UserAccess:
+    """ACL view of one user: group ids and the best granted level per report and dashboard."""
+
+    __slots__ = ("group_ids", "report_levels", "dashboard_levels")
+
+    def __init__(self, group_ids, report_levels, dashboard_levels):
+        self.group_ids = group_ids
+        self.report_levels = report_levels
+        self.dashboard_levels = dashboard_levels
+
+
+_graphs = OrderedDict()
+_graph_lock = threading.Lock()
+_version = None
+_version_checked_at = 0.0
+_generation = 0  # bumped on every clear, so graphs loaded before it are not stored
+
+
+def _current_version(session):
+    row = session.query(PermissionVersion.version).filter_by(scope=VERSION_SCOPE).first()
+    return row[0] if row else 0
+
+
+def _check_version(session):
+    """Drop cached graphs when another process changed permissions (at most one query per TTL)."""
+    global _version, _version_checked_at
+    now = time.monotonic()
+    if _version is not None and now - _version_checked_at < PERMISSION_VERSION_TTL:
+        return
+    version = _current_version(session)
+    with _graph_lock:
+        if version != _version:
+            _clear_graphs()
+            _version = version
+        _version_checked_at = now
+
+
+def _clear_graphs():
+    global _generation
+    _graphs.clear()
+    _generation += 1
+
+
+def clear_permission_cache():
+    """Forget every cached graph and re-read the version on next use."""
+    global _version
+    with _graph_lock:
+        _clear_graphs()
+        _version = None
+
+
+def bump_permission_version(session):
+    """Record a permission change in session's transaction; the caller commits."""
+    updated = session.query(PermissionVersion).filter_by(scope=VERSION_SCOPE).update(
+        {PermissionVersion.version: PermissionVersion.version + 1}, synchronize_session=False
+    )
+    if not updated:
+        session.add(PermissionVersion(scope=VERSION_SCOPE, version=1))
+    session.info["permissions_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_after_permission_change(session):
+    if session.info.pop("permissions_changed", False):
+        clear_permission_cache()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_change(session):
+    session.info.pop("permissions_changed", None)
+
+
+def _load_user_access(session, user_id):
+    group_ids = frozenset(
+        gid for (gid,) in session.query(group_members.c.group_id).filter(group_members.c.user_id == user_id)
+    )
+    from .report_access import ensure_report_access
+
+    ensure_report_access()
+    report_rows = session.query(UserReportAccess.report_id, UserReportAccess.level).filter(
+        UserReportAccess.user_id == user_id
+    )
+    dashboard_rank = case(DASHBOARD_LEVEL_ORDER, value=DashboardPermission.level, else_=0)
+    dashboard_rows = (
+        session.query(DashboardPermission.dashboard_id, func.max(dashboard_rank))
+        .filter(or_(DashboardPermission.user_id == user_id, DashboardPermission.group_id.in_(list(group_ids))))
+        .group_by(DashboardPermission.dashboard_id)
+    )
+    return UserAccess(
+        group_ids,
+        {report_id: LEVEL_ORDER[level] for report_id, level in report_rows},
+        {dashboard_id: rank for dashboard_id, rank in dashboard_rows if rank},
+    )
+
+
+def user_access(session, user_id):
+    """The cached UserAccess of user_id, loading it on first use."""
+    _check_version(session)
+    with _graph_lock:
+        access = _graphs.get(user_id)
+        if access is not None:
+            _graphs.move_to_end(user_id)
+            return access
+        generation = _generation
+    access = _load_user_access(session, user_id)
+    with _graph_lock:
+        if generation == _generation:
+            _graphs[user_id] = access
+            while len(_graphs) > PERMISSION_CACHE_SIZE:
+                _graphs.popitem(last=False)
+    return access
+
+
+def user_group_ids(session, user_id):
+    return user_access(session, user_id).group_ids
+
+
+def granted_report_level(session, user_id, report_id):
+    """Best level the user holds on report_id through ownership, direct or group grants, or None."""
+    return LEVEL_BY_RANK.get(user_access(session, user_id).report_levels.get(report_id))
+
+
+def dashboard_level_allows(session, user_id, dashboard_id, required_level=None):
+    """True if the user or one of their groups was granted required_level (any level when None) on the dashboard."""
+    rank = user_access(session, user_id).dashboard_levels.get(dashboard_id)
+    if not rank:
+        return False
+    return required_level is None or rank >= DASHBOARD_LEVEL_ORDER.get(required_level, 0)
+
+
+def get_effective_permissions(session, user, reports):
+    """
+    Resolve the effective level of `user` on every report in `reports` from
+    the cached permission graph. Returns {report_id: level} where level is
+    Owner for the owner, the highest granted level otherwise, Viewer for
+    other reports in the user's organization, and None for no access.
+    """
+    user_id = user['id']
+    org_id = user.get('organization_id', user.get('org_id'))
+    if not reports:
+        return {}
+    granted = user_access(session, user_id).report_levels
+
+    levels = {}
+    for r in reports:
+        if r.owner_id == user_id:
+            levels[r.id] = "Owner"
+        elif granted.get(r.id):
+            levels[r.id] = LEVEL_BY_RANK[granted[r.id]]
+        else:
+            levels[r.id] = "Viewer" if r.organization_id == org_id else None
+    return levels
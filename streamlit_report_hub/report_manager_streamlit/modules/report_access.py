@@ -0,0 +1,159 @@
+import sys
+import threading
+from sqlalchemy import select, insert, union_all, case, literal, func
+from models import Report, ReportPermission, UserReportAccess, group_members
+from .permissions import LEVEL_ORDER, LEVEL_BY_RANK
+
+# -------------------------
+# Materialized Report Access
+# -------------------------
+# user_report_access holds one row per (user, report) the user owns or was
+# granted directly or through a group, with the best resulting level, so
+# "reports this user can open" is one range scan of its primary key. Rows
+# are recomputed from reports, report_permissions and group_members by every
+# write that changes them (refresh_report_access / refresh_user_access) and
+# removed with their user or report by ORM cascades. Organization-wide Viewer
+# access is not materialized (it would need a row per user per report); it
+# stays a Report.organization_id filter.
+# Check or rebuild from the source tables: python -m modules.report_access [--check]
+_populated = False
+_populated_lock = threading.Lock()
+
+
+def _access_rows(report_ids=None, user_ids=None):
+    """SELECT user_id, report_id, level of the access rows derived from the source tables."""
+    rank = case(LEVEL_ORDER, value=ReportPermission.level, else_=0)
+    owners = select(
+        Report.owner_id.label("user_id"), Report.id.label("report_id"),
+        literal(LEVEL_ORDER["Owner"]).label("rank"),
+    ).where(Report.owner_id.is_not(None))
+    direct = select(ReportPermission.user_id, ReportPermission.report_id, rank).where(
+        ReportPermission.user_id.is_not(None)
+    )
+    via_groups = select(group_members.c.user_id, ReportPermission.report_id, rank).join(
+        group_members, group_members.c.group_id == ReportPermission.group_id
+    )
+    if report_ids is not None:
+        owners = owners.where(Report.id.in_(report_ids))
+        direct = direct.where(ReportPermission.report_id.in_(report_ids))
+        via_groups = via_groups.where(ReportPermission.report_id.in_(report_ids))
+    if user_ids is not None:
+        owners = owners.where(Report.owner_id.in_(user_ids))
+        direct = direct.where(ReportPermission.user_id.in_(user_ids))
+        via_groups = via_groups.where(group_members.c.user_id.in_(user_ids))
+    grants = union_all(owners, direct, via_groups).subquery()
+    best = func.max(grants.c.rank)
+    return (
+        select(grants.c.user_id, grants.c.report_id, case(LEVEL_BY_RANK, value=best).label("level"))
+        .group_by(grants.c.user_id, grants.c.report_id)
+        .having(best > 0)
+    )
+
+
+def _replace_rows(session, condition, rows):
+    session.flush()
+    session.query(UserReportAccess).filter(condition).delete(synchronize_session=False)
+    session.execute(insert(UserReportAccess).from_select(["user_id", "report_id", "level"], rows))
+
+
+def refresh_report_access(session, report_ids):
+    """Recompute the access rows of report_ids after their owner or ACL entries changed (the caller commits)."""
+    report_ids = list(report_ids)
+    if report_ids:
+        _replace_rows(session, UserReportAccess.report_id.in_(report_ids), _access_rows(report_ids=report_ids))
+
+
+def refresh_user_access(session, user_ids):
+    """Recompute the access rows of user_ids after their group memberships changed (the caller commits)."""
+    user_ids = list(user_ids)
+    if user_ids:
+        _replace_rows(session, UserReportAccess.user_id.in_(user_ids), _access_rows(user_ids=user_ids))
+
+
+def ensure_report_access():
+    """
+    Fill the table on first use when it is empty but reports exist (databases
+    from before it existed). The rebuild runs and commits in a short-lived
+    session of its own, never in the caller's.
+    """
+    global _populated
+    if _populated:
+        return
+    from db import SessionLocal
+
+    with _populated_lock:
+        if _populated:
+            return
+        s = SessionLocal()
+        try:
+            if s.query(UserReportAccess.user_id).first() is None and s.query(Report.id).first() is not None:
+                rebuild_report_access(s)
+                s.commit()
+                print("[Access] Built user_report_access from the permission tables.")
+            _populated = True
+        except Exception as e:
+            s.rollback()
+            print(f"[Access][Error] Failed to build user_report_access: {e}")
+        finally:
+            s.close()
+
+
+def accessible_report_ids(session, user_id):
+    """Selectable of the ids of reports user_id owns or was granted, for use as Report.id.in_(...)."""
+    ensure_report_access()
+    return select(UserReportAccess.report_id).where(UserReportAccess.user_id == user_id)
+
+
+# -------------------------
+# Consistency check / rebuild
+# -------------------------
+def rebuild_report_access(session):
+    """Replace every row with one derived from the source tables (the caller commits)."""
+    session.flush()
+    session.query(UserReportAccess).delete(synchronize_session=False)
+    session.execute(insert(UserReportAccess).from_select(["user_id", "report_id", "level"], _access_rows()))
+
+
+def check_report_access(repair=True):
+    """
+    Compare user_report_access with the source tables and rebuild it when
+    they disagree. Returns (missing, stale): rows that should exist but do
+    not, and rows that should not exist or have the wrong level.
+    Run from the app directory: python -m modules.report_access --check
+    """
+    from db import SessionLocal
+
+    s = SessionLocal()
+    try:
+        expected = set(tuple(r) for r in s.execute(_access_rows()))
+        actual = set(tuple(r) for r in s.query(
+            UserReportAccess.user_id, UserReportAccess.report_id, UserReportAccess.level
+        ))
+        missing, stale = expected - actual, actual - expected
+        print(f"[Access] {len(actual)} row(s): {len(missing)} missing, {len(stale)} stale.")
+        if repair and (missing or stale):
+            rebuild_report_access(s)
+            s.commit()
+            print(f"[Access] Rebuilt user_report_access ({len(expected)} row(s)).")
+        return missing, stale
+    except Exception as e:
+        s.rollback()
+        print(f"[Access][Error] Failed to check user_report_access: {e}")
+        raise
+    finally:
+        s.close()
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        check_report_access()
+    else:
+        from db import SessionLocal
+
+        s = SessionLocal()
+        try:
+            rebuild_report_access(s)
+            s.commit()
+            print(f"[Access] Rebuilt user_report_access ({s.query(UserReportAccess).count()} row(s)).")
+        finally:
+            s.close()
@@ -1,13 +1,24 @@
 import streamlit as st
 from .utils import safe_rerun
-from db import SessionLocal
+from .dataset_cache import load_dataset
+from .ingestion import enqueue_ingestion
+from .permissions import get_effective_permissions, bump_permission_version
+from .report_access import refresh_report_access, accessible_report_ids
+from .search_index import index_report, set_indexed_columns, matching_report_ids
+from .pdf_preview import show_pdf, report_thumbnail, file_download
+from .blob_store import incoming_path, store_blob, release_blob
+from .file_metadata import (
+    compute_file_metadata, apply_file_metadata, format_size, file_extension,
+    write_stream, sha256_file, artifact_key,
+)
+from db import get_session, release_session
 import os
 import pandas as pd
 import io
 from models import Report, User, Group, ReportPermission, group_members, Folder, Comment
-from sqlalchemy import or_
+from sqlalchemy import or_, and_, func
+from sqlalchemy.orm import joinedload, object_session
 import uuid
-import base64
 
 st.markdown("""
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.2/css/all.min.css">
@@ -36,6 +47,8 @@ st.markdown("""
 
 
 
+PAGE_SIZES = [10, 25, 50, 100]
+
 def reports_page():
     st.title("All Reports")
     st.caption("Manage and organize your organization's reports")
@@ -45,7 +58,7 @@ def reports_page():
         st.info("Superadmins do not manage reports.")
         return
     
-    s = SessionLocal()
+    s = get_session()
     try:
         if 'current_folder' not in st.session_state:
             st.session_state.current_folder = None
@@ -73,41 +86,95 @@ def reports_page():
         if st.session_state.show_new_folder:
             new_folder_form(s, user)
         
+        # Folders are loaded once and shared by the folder grid, upload form and move widgets
+        folders = fetch_folders(s, user)
+
         if st.session_state.show_upload:
-            report_upload_page(s, user)
+            report_upload_page(s, user, folders)
         
-        display_folders(s, user, search_term)
+        display_folders(s, user, search_term, folders)
         
         if st.session_state.current_folder:
-            folder = s.query(Folder).filter_by(id=st.session_state.current_folder).first()
+            folder = next((f for f in folders if f.id == st.session_state.current_folder), None)
             if folder:
                 st.subheader(f"{folder.name} Folder")
             if st.button("Back to All Folders"):
                 st.session_state.current_folder = None
                 safe_rerun()
         
-        reports = fetch_reports(s, user, st.session_state.current_folder)
-        filtered_reports = filter_and_sort_reports(reports, search_term, type_filter, date_sort)
-        
-        st.subheader(f"Reports ({len(filtered_reports)} items)")
-        for r in filtered_reports:
-            display_report_item(s, user, r)
+        query = reports_query(s, user, st.session_state.current_folder)
+        if query is None:
+            return
+        query = filter_and_sort_reports(query, search_term, type_filter, date_sort)
+        total = query.order_by(None).count()
+
+        st.subheader(f"Reports ({total} items)")
+        page_size = st.selectbox("Reports per page", PAGE_SIZES, index=1, key="report_page_size")
+
+        # Keyset pagination: remember the cursor each visited page starts from,
+        # and start over whenever the listing changes
+        listing = (st.session_state.current_folder, search_term, type_filter, date_sort, page_size)
+        if st.session_state.get("report_listing") != listing:
+            st.session_state.report_listing = listing
+            st.session_state.report_cursors = [None]
+        cursors = st.session_state.report_cursors
+        page_reports, next_cursor = paginate_reports(query, date_sort, cursors[-1], page_size)
+
+        levels = get_effective_permissions(s, user, page_reports)
+        for r in page_reports:
+            display_report_item(s, user, r, levels.get(r.id), folders)
+
+        col_prev, col_info, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if len(cursors) > 1 and st.button("← Previous", key="report_prev_page"):
+                cursors.pop()
+                safe_rerun()
+        with col_info:
+            st.caption(f"Page {len(cursors)} of {max((total + page_size - 1) // page_size, 1)}")
+        with col_next:
+            if next_cursor and st.button("Next →", key="report_next_page"):
+                cursors.append(next_cursor)
+                safe_rerun()
     
     except Exception as e:
         st.error(f"Error: {str(e)}")
     finally:
-        s.close()
+        release_session(s)
 
-def display_folders(s, user, search_term):
+def fetch_folders(s, user):
+    org_id = user.get('organization_id', user.get('org_id'))
+    if not org_id:
+        return []
+    return s.query(Folder).filter_by(organization_id=org_id).all()
+
+def display_folders(s, user, search_term, folders=None):
     org_id = user.get('organization_id', user.get('org_id'))
     if not org_id:
         st.error("Organization ID not found in user session.")
         return
-    folders = s.query(Folder).filter_by(organization_id=org_id).all()
-    filtered_folders = [f for f in folders if search_term.lower() in f.name.lower()] if search_term else folders
+    if folders is None:
+        folders = fetch_folders(s, user)
+    if search_term:
+        filtered_folders = (
+            s.query(Folder)
+            .filter(
+                Folder.organization_id == org_id,
+                Folder.name.ilike(_like_pattern(search_term), escape="\\"),
+            )
+            .all()
+        )
+    else:
+        filtered_folders = folders
+    # One grouped aggregate for all folder counts
+    counts = dict(
+        s.query(Report.folder_id, func.count(Report.id))
+        .filter(Report.folder_id.in_([f.id for f in filtered_folders]))
+        .group_by(Report.folder_id)
+        .all()
+    ) if filtered_folders else {}
     folder_cols = st.columns(3)
     for i, f in enumerate(filtered_folders):
-        count = s.query(Report).filter_by(folder_id=f.id).count()
+        count = counts.get(f.id, 0)
         with folder_cols[i % 3]:
             st.markdown(
                 f"""<div class="folder-card">
@@ -153,12 +220,13 @@ def new_folder_form(s, user):
             safe_rerun()
 
 
-def report_upload_page(s, user):
+def report_upload_page(s, user, folders=None):
     org_id = user.get('organization_id', user.get('org_id'))
     if not org_id:
         st.error("Organization ID not found in user session.")
         return
-    folders = s.query(Folder).filter_by(organization_id=org_id).all()
+    if folders is None:
+        folders = fetch_folders(s, user)
     folder_options = {"None": None}
     folder_options.update({f.name: f.id for f in folders})
     
@@ -179,10 +247,11 @@ def report_upload_page(s, user):
                 return
             
             report_id = str(uuid.uuid4())
-            os.makedirs(os.path.join('uploads', str(org_id)), exist_ok=True)
-            filepath = os.path.join('uploads', str(org_id), f"{report_id}_{uploaded_file.name}")
-            with open(filepath, 'wb') as f:
-                f.write(uploaded_file.getbuffer())
+            uploaded_file.seek(0)
+            tmp_path = incoming_path()
+            _, content_hash = write_stream(uploaded_file, tmp_path)
+            # Identical files are stored once, see modules/blob_store.py
+            filepath = store_blob(s, tmp_path, content_hash, file_extension(uploaded_file.name))
 
             report = Report(
                 id=report_id,
@@ -193,6 +262,7 @@ def report_upload_page(s, user):
                 organization_id=org_id,
                 folder_id=folder_options[selected_folder]
             )
+            apply_file_metadata(report, compute_file_metadata(filepath, uploaded_file.name, uploaded_file.type, content_hash))
             s.add(report)
             perm = ReportPermission(
                 id=str(uuid.uuid4()),
@@ -201,7 +271,12 @@ def report_upload_page(s, user):
                 level='Owner'
             )
             s.add(perm)
+            refresh_report_access(s, [report_id])
+            bump_permission_version(s)
             s.commit()
+            index_report(s, report)
+            # Parsing, profiling and PDF text extraction happen in the background ingestion pool
+            enqueue_ingestion(s, report_id)
             
             st.success(f"Report '{title}' uploaded successfully! 📄")
             st.session_state.report_title = ""
@@ -211,81 +286,136 @@ def report_upload_page(s, user):
 
 
 
-def fetch_reports(s, user, folder_id):
-    user_groups = [g.id for g in s.query(Group).join(group_members).filter(group_members.c.user_id == user['id']).all()]
+def reports_query(s, user, folder_id):
+    """Query for the reports `user` can see in folder_id (root when None), or None."""
     org_id = user.get('organization_id', user.get('org_id'))
     if not org_id:
         st.error("Organization ID not found in user session.")
-        return []
-    query = s.query(Report).filter(
+        return None
+    query = s.query(Report).options(
+        joinedload(Report.owner),
+        joinedload(Report.profile),
+    ).filter(
         or_(
-            Report.owner_id == user['id'],
             Report.organization_id == org_id,
-            Report.id.in_(
-                s.query(ReportPermission.report_id)
-                .filter(
-                    or_(
-                        ReportPermission.user_id == user['id'],
-                        ReportPermission.group_id.in_(user_groups)
-                    )
-                )
-            )
+            # Owned and granted reports, see modules/report_access.py
+            Report.id.in_(accessible_report_ids(s, user['id']))
         )
     )
     if folder_id:
         query = query.filter(Report.folder_id == folder_id)
     else:
         query = query.filter(Report.folder_id.is_(None))
-    return query.all()
+    return query
 
-def filter_and_sort_reports(reports, search_term, type_filter, date_sort):
-    filtered = [r for r in reports if search_term.lower() in r.title.lower() or search_term.lower() in r.filename.lower()]
+def fetch_reports(s, user, folder_id):
+    query = reports_query(s, user, folder_id)
+    return query.all() if query is not None else []
+
+def _like_pattern(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def filter_and_sort_reports(query, search_term, type_filter, date_sort):
+    """Apply the search box, type filter and date sort to a reports query."""
+    matching = matching_report_ids(search_term)
+    if matching is not None:
+        query = query.filter(Report.id.in_(matching))
     if type_filter != "All Types":
-        ext_map = {"PDF": ".pdf", "CSV": ".csv", "XLSX": ".xlsx", "PPTX": ".pptx"}
-        filtered = [r for r in filtered if r.filename.lower().endswith(ext_map[type_filter])]
-    filtered.sort(key=lambda r: r.created_at, reverse=(date_sort == "Newest"))
-    return filtered
-
-def display_report_item(s, user, r):
+        query = query.filter(Report.file_ext == type_filter.lower())
+    if date_sort == "Newest":
+        return query.order_by(Report.created_at.desc(), Report.id.desc())
+    return query.order_by(Report.created_at.asc(), Report.id.asc())
+
+def paginate_reports(query, date_sort, cursor, page_size):
+    """
+    Return (reports, next_cursor) for the page starting after `cursor`, a
+    (created_at, id) pair from the previous page's last row (None for the
+    first page). The query must already be sorted by filter_and_sort_reports.
+    """
+    if cursor:
+        created_at, report_id = cursor
+        if date_sort == "Newest":
+            query = query.filter(or_(
+                Report.created_at < created_at,
+                and_(Report.created_at == created_at, Report.id < report_id),
+            ))
+        else:
+            query = query.filter(or_(
+                Report.created_at > created_at,
+                and_(Report.created_at == created_at, Report.id > report_id),
+            ))
+    rows = query.limit(page_size + 1).all()
+    if len(rows) > page_size:
+        last = rows[page_size - 1]
+        return rows[:page_size], (last.created_at, last.id)
+    return rows, None
+
+def display_report_item(s, user, r, level=None, folders=None):
     # File type to Font Awesome icon
-    ext = r.filename.split('.')[-1].lower()
+    ext = r.file_ext or file_extension(r.filename)
     icon_map = {
         'pdf': 'file-pdf', 'csv': 'file-csv', 'xlsx': 'file-excel', 'pptx': 'file-powerpoint'
     }
     fa_icon = icon_map.get(ext, 'file-lines')
+    icon_html = f'<i class="fa-solid fa-{fa_icon} report-icon"></i>'
+    # Rendered by the ingestion workers; the icon stands in until it exists
+    thumbnail = report_thumbnail(r) if ext == 'pdf' else None
+    if thumbnail:
+        icon_html = ""
 
-    owner = s.query(User).filter_by(id=r.owner_id).first()
+    owner = r.owner
     uploader_name = owner.full_name if owner else r.owner_id
-    size = os.path.getsize(r.filepath) / 1024
-    size_str = f"{size:.1f} KB" if size < 1024 else f"{size/1024:.1f} MB"
+    size_str = format_size(r.size_bytes)
+    if r.row_count is not None:
+        size_str += f" · {r.row_count:,} rows × {r.column_count} cols"
+    elif r.page_count:
+        size_str += f" · {r.page_count} page{'s' if r.page_count != 1 else ''}"
     date_str = r.created_at.strftime('%Y-%m-%d')
-    level = get_effective_permission(user['id'], r)
+    if level is None:
+        level = get_effective_permission(user['id'], r)
     color = {'Viewer': '#e2e8f0', 'Commenter': '#ffeb8a', 'Editor': '#a7e1fa', 'Owner': '#6ee7b7'}.get(level, '#eeeeee')
     badge = f"""<span style="background-color:{color};
         color:#1c2129;font-weight:500;padding:5px 11px;border-radius:7px;font-size:13px;margin-left:6px;">
         <i class="fa-solid fa-key"></i> {level.capitalize()}
     </span>"""
-
-    st.markdown(
+    status_badge = ""
+    if r.profile:
+        status_colors = {'pending': '#e2e8f0', 'processing': '#ffeb8a', 'ready': '#6ee7b7', 'failed': '#fca5a5'}
+        status_icons = {'pending': 'fa-clock', 'processing': 'fa-gear', 'ready': 'fa-circle-check', 'failed': 'fa-triangle-exclamation'}
+        status_badge = f"""<span title="{r.profile.error or ''}" style="background-color:{status_colors.get(r.profile.status, '#eeeeee')};
+            color:#1c2129;font-weight:500;padding:5px 11px;border-radius:7px;font-size:13px;margin-left:6px;">
+            <i class="fa-solid {status_icons.get(r.profile.status, 'fa-circle-info')}"></i> {r.profile.status.capitalize()}
+        </span>"""
+
+    card = st
+    if thumbnail:
+        thumb_col, card = st.columns([1, 11], vertical_alignment="center")
+        thumb_col.image(thumbnail, width=54)
+    card.markdown(
         f"""
         <div class="report-card">
-            <i class="fa-solid fa-{fa_icon} report-icon"></i>
+            {icon_html}
             <div>
                 <div class="card-title" style='margin-bottom:2px;'>{r.title}</div>
                 <div class="card-meta">{r.filename} · <i class="fa-solid fa-database"></i> {size_str}</div>
                 <div class="card-meta"><i class="fa-regular fa-user"></i> {uploader_name} · <i class="fa-regular fa-calendar"></i> {date_str}</div>
             </div>
             <div style="margin-left:auto;">
-                {badge}
+                {status_badge}{badge}
             </div>
         </div>
         """, unsafe_allow_html=True
     )
 
-    with st.expander("Details"):
+    # Details are only built for opened cards; an expander would run its body
+    # (dataset load, editors, comments) for every report on the page
+    if not st.toggle("Details", key=f"details_{r.id}"):
+        return
+    with st.container(border=True):
         # View/Download section
         if ext in ("csv", "xlsx"):
-            df = pd.read_csv(r.filepath) if ext == "csv" else pd.read_excel(io.BytesIO(open(r.filepath, 'rb').read()))
+            df = load_dataset(artifact_key(r), r.filepath, r.filename)
             if level in ['Editor', 'Owner']:
                 mode = st.selectbox("Mode", ["View", "Edit"], key=f"mode_{r.id}")
                 if mode == "View":
@@ -293,27 +423,24 @@ def display_report_item(s, user, r):
                 else:
                     edited_df = st.data_editor(df, use_container_width=True, key=f"editor_{r.id}")
                     if st.button("Save Changes", key=f"save_{r.id}"):
-                        save_file(edited_df, r.filepath)
+                        save_file(edited_df, r.filepath, report=r)
+                        s.commit()
+                        enqueue_ingestion(s, r.id)
                         st.success("Changes saved!")
             else:
                 st.subheader("View")
                 st.dataframe(df, use_container_width=True)
         elif ext == "pdf":
-            with open(r.filepath, "rb") as f:
-                pdf_bytes = f.read()
             st.subheader("View PDF")
-            base64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
-            pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="100%" height="600" type="application/pdf"></iframe>'
-            st.markdown(pdf_display, unsafe_allow_html=True)
+            show_pdf(r, key=f"pdf_{r.id}")
         else:
             st.subheader("Download")
-            with open(r.filepath, 'rb') as f:
-                st.download_button(
-                    label="Download <i class='fa-solid fa-download'></i>",
-                    data=f,
-                    file_name=r.filename,
-                    mime="application/octet-stream",
-                )
+            st.download_button(
+                label="Download <i class='fa-solid fa-download'></i>",
+                data=file_download(r.filepath),
+                file_name=r.filename,
+                mime="application/octet-stream",
+            )
 
         # Comment section
         if level in ['Commenter', 'Editor', 'Owner']:
@@ -327,8 +454,8 @@ def display_report_item(s, user, r):
 
         # Move to folder
         if level in ['Editor', 'Owner']:
-            org_id = user.get('organization_id', user.get('org_id'))
-            folders = s.query(Folder).filter_by(organization_id=org_id).all()
+            if folders is None:
+                folders = fetch_folders(s, user)
             folder_options = ["None"] + [f.name for f in folders]
             current_folder_name = next((f.name for f in folders if f.id == r.folder_id), "None")
             selected_folder = st.selectbox("Move to folder", folder_options, index=folder_options.index(current_folder_name), key=f"move_select_{r.id}")
@@ -337,6 +464,7 @@ def display_report_item(s, user, r):
                     new_folder_id = next((f.id for f in folders if f.name == selected_folder), None)
                     r.folder_id = new_folder_id
                     s.commit()
+                    index_report(s, r)
                     st.success(f"Moved to {selected_folder}!")
                     safe_rerun()
 
@@ -360,23 +488,12 @@ def get_effective_permission(user_id, report):
     if report.owner_id == user_id:
         return "Owner"
     
-    s = SessionLocal()
+    s = get_session()
     try:
-        direct = s.query(ReportPermission).filter_by(report_id=report.id, user_id=user_id).first()
-        direct_level = direct.level if direct else None
-        
-        user_groups = [g.id for g in s.query(Group).join(group_members).filter(group_members.c.user_id == user_id).all()]
-        group_perms = s.query(ReportPermission).filter(ReportPermission.report_id == report.id, ReportPermission.group_id.in_(user_groups)).all()
-        group_levels = [p.level for p in group_perms]
-        
-        all_levels = [lvl for lvl in [direct_level] + group_levels if lvl]
-        if not all_levels:
-            return "Viewer" if report.organization_id == st.session_state.user.get('organization_id', st.session_state.user.get('org_id')) else None
-        
-        order = {"Viewer": 1, "Commenter": 2, "Editor": 3, "Owner": 4}
-        return max(all_levels, key=lambda l: order[l])
+        user = dict(st.session_state.user, id=user_id)
+        return get_effective_permissions(s, user, [report]).get(report.id)
     finally:
-        s.close()
+        release_session(s)
 
 def assign_report_permissions(s, user, report_id, current_level):
     report = s.query(Report).filter_by(id=report_id).first()
@@ -427,6 +544,8 @@ def assign_report_permissions(s, user, report_id, current_level):
         for name in selected_groups:
             perm = ReportPermission(id=str(uuid.uuid4()), report_id=report_id, group_id=group_options[name], level=group_level)
             s.add(perm)
+        refresh_report_access(s, [report_id])
+        bump_permission_version(s)
         s.commit()
         st.success("Permissions saved successfully! <i class='fa-solid fa-lock'></i>", unsafe_allow_html=True)
 
@@ -454,12 +573,25 @@ def assign_report_permissions(s, user, report_id, current_level):
         st.info("No permissions set.")
 
 
-def save_file(df, filepath):
+def save_file(df, filepath, report=None):
     ext = os.path.splitext(filepath)[1].lower()
+    # A report's file may be shared with other reports: write a new blob
+    # instead of changing it in place
+    target = incoming_path(ext) if report is not None else filepath
     if ext == '.csv':
-        df.to_csv(filepath, index=False)
+        df.to_csv(target, index=False)
     elif ext == '.xlsx':
-        df.to_excel(filepath, index=False)
+        df.to_excel(target, index=False)
+    if report is not None:
+        # Move the report to the new content and refresh the stored metadata
+        # (the caller commits)
+        session = object_session(report)
+        content_hash = sha256_file(target)
+        report.filepath = store_blob(session, target, content_hash, ext.lstrip('.'))
+        release_blob(session, filepath, artifact_key(report))
+        apply_file_metadata(report, compute_file_metadata(report.filepath, report.filename, report.mime_type, content_hash))
+        report.row_count, report.column_count = len(df), len(df.columns)
+        set_indexed_columns(report, df.columns)
 
 def save_comment(s, report_id, user_id, comment):
     if not comment.strip():
@@ -476,10 +608,16 @@ def save_comment(s, report_id, user_id, comment):
 
 
 def display_comments(s, report_id):
-    comments = s.query(Comment).filter_by(report_id=report_id).order_by(Comment.created_at.desc()).all()
+    comments = (
+        s.query(Comment)
+        .options(joinedload(Comment.user))
+        .filter_by(report_id=report_id)
+        .order_by(Comment.created_at.desc())
+        .all()
+    )
     if comments:
         for c in comments:
-            user = s.query(User).filter_by(id=c.user_id).first()
+            user = c.user
             st.write(f"**{user.full_name}** ({c.created_at.strftime('%Y-%m-%d %H:%M')}): {c.comment}")
     else:
         st.info("No comments yet.")
@@ -487,9 +625,11 @@ def display_comments(s, report_id):
 def delete_report(s, report_id):
     report = s.query(Report).filter_by(id=report_id).first()
     if report:
-        if os.path.exists(report.filepath):
-            os.remove(report.filepath)
+        # Removes the file (and its cache and thumbnail) once no other report
+        # shares it and the deletion commits
+        release_blob(s, report.filepath, artifact_key(report))
         s.delete(report)
+        bump_permission_version(s)  # its ACL entries go with it
         s.commit()
 
 
@@ -500,7 +640,7 @@ def home_reports_list():
         st.info("Superadmins do not have personal reports.")
         return
     
-    s = SessionLocal()
+    s = get_session()
     try:
         # Fetch reports not in any folder for simplicity, or adapt to show all
         reports = fetch_reports(s, user, folder_id=None)
@@ -508,10 +648,12 @@ def home_reports_list():
             st.info("You have no reports yet.")
             return
         
+        levels = get_effective_permissions(s, user, reports)
+        folders = fetch_folders(s, user)
         for r in reports:
-            display_report_item(s, user, r)  # Reuse your existing display function
+            display_report_item(s, user, r, levels.get(r.id), folders)  # Reuse your existing display function
 
     except Exception as e:
         st.error(f"Error loading reports: {str(e)}")
     finally:
-        s.close()
+        release_session(s)
@@ -0,0 +1,72 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# -------------------------
+# Visualization Result Cache
+# -------------------------
+# Process-wide LRU of rendered visualization results (figure JSON or the
+# frame behind a table), shared by all sessions and capped by total bytes.
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+_entries = OrderedDict()  # key -> (value, size)
+_total_bytes = 0
+_lock = threading.Lock()
+
+
+def make_cache_key(viz_id, viz_type, data_config, source_version):
+    """Key a result by visualization id, config hash and source dataset version."""
+    config_hash = hashlib.sha256(f"{viz_type}|{data_config}".encode("utf-8")).hexdigest()
+    return (viz_id, config_hash, source_version)
+
+
+def _estimate_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_estimate_size(v) for v in value.values())
+    return 64
+
+
+def get_cached_result(key):
+    """Return the cached value for key (marking it most recently used), or None."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        _entries.move_to_end(key)
+        return entry[0]
+
+
+def put_cached_result(key, value):
+    """Store value under key, evicting least recently used entries past the byte cap."""
+    global _total_bytes
+    size = _estimate_size(value)
+    if size > RESULT_CACHE_MAX_BYTES:
+        return
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _total_bytes -= old[1]
+        _entries[key] = (value, size)
+        _total_bytes += size
+        while _total_bytes > RESULT_CACHE_MAX_BYTES and _entries:
+            _, (_, evicted_size) = _entries.popitem(last=False)
+            _total_bytes -= evicted_size
+
+
+def invalidate_visualization(viz_id):
+    """Drop every cached result for one visualization."""
+    global _total_bytes
+    with _lock:
+        for key in [k for k in _entries if k[0] == viz_id]:
+            _total_bytes -= _entries.pop(key)[1]
+
+
+def cache_stats():
+    with _lock:
+        return {"entries": len(_entries), "bytes": _total_bytes, "max_bytes": RESULT_CACHE_MAX_BYTES}
@@ -0,0 +1,296 @@
+import os
+import re
+import sys
+import datetime
+import threading
+from sqlalchemy import text, select, bindparam, or_, and_, String
+from db import engine
+from models import Report, SearchDocument
+from .storage import get_storage
+
+# -------------------------
+# Report Search Index
+# -------------------------
+# Every report has one row in report_search_documents with its title,
+# filename, folder name, column headers and extracted PDF text. Searching
+# goes through a backend: SQLite FTS5 (ranked prefix matching over an
+# external-content index kept in sync by triggers) or, on other databases
+# or builds without FTS5, plain ILIKE over the documents table. PDF text is
+# extracted by the ingestion workers (modules/ingestion.py), never during a
+# page run. init_db (db.py) and the d91b5c3e6a28 migration create the
+# documents of reports from before search existed; their PDF text is
+# extracted with python -m modules.search_index --missing
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')  # auto, fts5 or like
+MAX_BODY_CHARS = int(os.getenv('SEARCH_MAX_BODY_CHARS', '200000'))
+RANKED_LIMIT = 200
+
+FTS_TABLE = "report_search"
+DOCUMENT_FIELDS = ["title", "filename", "folder", "columns", "body"]
+# bm25 weights, in DOCUMENT_FIELDS order: a title hit outranks a body hit
+FIELD_WEIGHTS = [10.0, 5.0, 3.0, 2.0, 1.0]
+
+
+def query_terms(search_term):
+    """Split user input into lowercased word terms (punctuation is ignored)."""
+    return re.findall(r"[^\W_]+", (search_term or "").lower())
+
+
+class LikeSearchBackend:
+    """Substring matching over report_search_documents; works on any database."""
+    name = "like"
+
+    def setup(self, connection):
+        pass
+
+    def _match(self, terms):
+        # Every term must appear in at least one field
+        return and_(*[
+            or_(*[getattr(SearchDocument, f).ilike(f"%{t}%") for f in DOCUMENT_FIELDS])
+            for t in terms
+        ])
+
+    def matching_ids(self, terms):
+        return select(SearchDocument.report_id).where(self._match(terms))
+
+    def ranked_ids(self, session, terms, limit, organization_id=None, extensions=None):
+        stmt = select(SearchDocument.report_id).where(self._match(terms))
+        if organization_id is not None or extensions is not None:
+            stmt = stmt.join(Report, Report.id == SearchDocument.report_id)
+        if organization_id is not None:
+            stmt = stmt.where(Report.organization_id == organization_id)
+        if extensions is not None:
+            stmt = stmt.where(Report.file_ext.in_(extensions))
+        rows = session.execute(stmt.order_by(SearchDocument.title).limit(limit))
+        return [r[0] for r in rows]
+
+
+class Fts5SearchBackend:
+    """SQLite FTS5 index over report_search_documents with prefix matching and bm25 ranking."""
+    name = "fts5"
+
+    def setup(self, connection):
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE}
+        ).first()
+        fields = ", ".join(DOCUMENT_FIELDS)
+        new_values = ", ".join(f"new.{f}" for f in DOCUMENT_FIELDS)
+        old_values = ", ".join(f"old.{f}" for f in DOCUMENT_FIELDS)
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"{fields}, content='report_search_documents', content_rowid='id', "
+            f"prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON report_search_documents BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, {fields}) VALUES (new.id, {new_values}); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON report_search_documents BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {fields}) VALUES ('delete', old.id, {old_values}); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON report_search_documents BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {fields}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {FTS_TABLE}(rowid, {fields}) VALUES (new.id, {new_values}); END"
+        ))
+        if not exists:
+            # Index documents written before the FTS table existed
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+    def _match(self, terms):
+        # Quoted prefix terms, implicitly ANDed: "sal"* "2024"*
+        return " ".join(f'"{t}"*' for t in terms)
+
+    def matching_ids(self, terms):
+        return text(
+            f"SELECT d.report_id FROM {FTS_TABLE} "
+            f"JOIN report_search_documents d ON d.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :fts_query"
+        ).bindparams(fts_query=self._match(terms)).columns(report_id=String)
+
+    def ranked_ids(self, session, terms, limit, organization_id=None, extensions=None):
+        weights = ", ".join(str(w) for w in FIELD_WEIGHTS)
+        report_join = ""
+        params = {"fts_query": self._match(terms), "limit": limit}
+        bind = []
+        if organization_id is not None or extensions is not None:
+            report_join = "JOIN reports r ON r.id = d.report_id "
+        if organization_id is not None:
+            report_join += "AND r.organization_id = :org_id "
+            params["org_id"] = organization_id
+        if extensions is not None:
+            report_join += "AND r.file_ext IN :exts "
+            params["exts"] = list(extensions)
+            bind.append(bindparam("exts", expanding=True))
+        rows = session.execute(
+            text(
+                f"SELECT d.report_id FROM {FTS_TABLE} "
+                f"JOIN report_search_documents d ON d.id = {FTS_TABLE}.rowid {report_join}"
+                f"WHERE {FTS_TABLE} MATCH :fts_query "
+                f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT :limit"
+            ).bindparams(*bind),
+            params
+        )
+        return [r[0] for r in rows]
+
+
+BACKENDS = {"fts5": Fts5SearchBackend, "like": LikeSearchBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """Return the configured backend, creating its index structures on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            return _backend
+        name = SEARCH_BACKEND
+        if name == "auto":
+            name = "fts5" if engine.dialect.name == "sqlite" else "like"
+        backend = BACKENDS[name]()
+        try:
+            with engine.begin() as connection:
+                backend.setup(connection)
+        except Exception as e:
+            if backend.name == "like":
+                raise
+            print(f"[Search][Warn] {backend.name} unavailable, using LIKE search: {e}")
+            backend = LikeSearchBackend()
+        _backend = backend
+    return _backend
+
+
+# -------------------------
+# Building documents
+# -------------------------
+def extract_pdf_text(filepath):
+    """Return the PDF's text (requires pypdf; "" without it)."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return ""
+    parts, size = [], 0
+    for page in PdfReader(filepath).pages:
+        page_text = page.extract_text() or ""
+        parts.append(page_text)
+        size += len(page_text)
+        if size >= MAX_BODY_CHARS:
+            break
+    return "\n".join(parts)[:MAX_BODY_CHARS]
+
+
+def _catalog_columns(report):
+    profile = report.profile
+    if profile is not None and profile.status == "ready" and profile.columns:
+        return [c["name"] for c in profile.columns]
+    return None
+
+
+def index_report(session, report, columns=None, extract_text=False):
+    """
+    Create or refresh the search document for report and commit. `columns`
+    are the dataset's headers; when omitted the stored column catalog (or the
+    previously indexed headers) is used. A PDF's text is (re-)extracted only
+    with extract_text, by the ingestion workers and the CLI; otherwise the
+    indexed text is kept. Returns False if indexing failed.
+    """
+    try:
+        get_search_backend()
+        doc = report.search_document
+        if doc is None:
+            doc = SearchDocument(report_id=report.id)
+            report.search_document = doc
+        doc.title = report.title or ""
+        doc.filename = report.filename or ""
+        doc.folder = report.folder.name if report.folder else ""
+        if columns is None:
+            columns = _catalog_columns(report)
+        if columns is not None:
+            doc.columns = " ".join(str(c) for c in columns)
+        elif doc.columns is None:
+            doc.columns = ""
+        if doc.body is None:
+            doc.body = ""
+        if extract_text and report.file_ext == "pdf":
+            try:
+                doc.body = extract_pdf_text(get_storage().local_path(report.filepath))
+            except Exception as e:
+                print(f"[Search][Warn] Could not extract text from {report.filepath}: {e}")
+        doc.updated_at = datetime.datetime.now(datetime.timezone.utc)
+        session.commit()
+        return True
+    except Exception as e:
+        session.rollback()
+        print(f"[Search][Error] Failed to index report {report.id}: {e}")
+        return False
+
+
+def set_indexed_columns(report, columns):
+    """Update the indexed headers of an already-indexed report (the caller commits)."""
+    if report.search_document is not None:
+        report.search_document.columns = " ".join(str(c) for c in columns)
+        report.search_document.updated_at = datetime.datetime.now(datetime.timezone.utc)
+
+
+# -------------------------
+# Querying
+# -------------------------
+def matching_report_ids(search_term):
+    """
+    Selectable of the ids of reports matching every term of search_term, for
+    use as Report.id.in_(...). Returns None when there is nothing to search.
+    """
+    terms = query_terms(search_term)
+    if not terms:
+        return None
+    return get_search_backend().matching_ids(terms)
+
+
+def ranked_report_ids(session, search_term, organization_id=None, limit=RANKED_LIMIT, extensions=None):
+    """
+    Ids of the best matches for search_term, most relevant first, limited to
+    reports whose file_ext is in extensions when given.
+    """
+    terms = query_terms(search_term)
+    if not terms:
+        return []
+    return get_search_backend().ranked_ids(session, terms, limit, organization_id, extensions)
+
+
+# -------------------------
+# Rebuild
+# -------------------------
+def rebuild_search_index(missing_only=False):
+    """
+    Re-create the search document of every report, or with missing_only only
+    index reports that have none yet and PDFs without indexed text.
+    Run from the app directory: python -m modules.search_index [--missing]
+    """
+    from db import SessionLocal
+
+    get_search_backend()
+    s = SessionLocal()
+    indexed = failed = 0
+    try:
+        query = s.query(Report)
+        if missing_only:
+            query = query.filter(or_(
+                ~Report.search_document.has(),
+                and_(Report.file_ext == "pdf", Report.search_document.has(SearchDocument.body == "")),
+            ))
+        for report in query.all():
+            if index_report(s, report, extract_text=True):
+                indexed += 1
+            else:
+                failed += 1
+    finally:
+        s.close()
+    print(f"[Search] Indexed {indexed} report(s), {failed} failed.")
+    return indexed, failed
+
+
+if __name__ == "__main__":
+    rebuild_search_index(missing_only="--missing" in sys.argv)
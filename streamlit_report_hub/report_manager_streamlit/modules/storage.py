@@ -0,0 +1,231 @@
+import io
+import os
+import threading
+
+# -------------------------
+# Report File Storage
+# -------------------------
+# Report.filepath is a storage key (e.g. uploads/blobs/ab/cd/<sha256>.csv).
+# The local backend keeps it on this machine's disk; the S3 backend keeps it
+# in a bucket (AWS, MinIO or any S3-compatible endpoint) so several app nodes
+# can share one store. Code that needs a real file (pandas, pypdf, ...) asks
+# for local_path(key), which the S3 backend serves from a read-through disk
+# cache.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')  # local or s3
+S3_BUCKET = os.getenv('S3_BUCKET')
+S3_PREFIX = os.getenv('S3_PREFIX', '')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')  # e.g. http://localhost:9000 for MinIO
+STORAGE_CACHE_DIR = os.getenv('STORAGE_CACHE_DIR', os.path.join('uploads', '.storage_cache'))
+STORAGE_CACHE_MAX_BYTES = int(os.getenv('STORAGE_CACHE_MAX_BYTES', str(5 * 1024 ** 3)))
+MULTIPART_CHUNK_SIZE = int(os.getenv('S3_MULTIPART_CHUNK_SIZE', str(16 * 1024 * 1024)))
+
+
+class LocalStorage:
+    """Keys are paths on the local filesystem."""
+    name = "local"
+
+    def put_file(self, src_path, key):
+        """Move the file at src_path to key."""
+        os.makedirs(os.path.dirname(key) or '.', exist_ok=True)
+        os.replace(src_path, key)
+
+    def exists(self, key):
+        return os.path.exists(key)
+
+    def size(self, key):
+        return os.path.getsize(key)
+
+    def version(self, key):
+        """A string that changes whenever the stored file does, or None if it is missing."""
+        try:
+            info = os.stat(key)
+        except OSError:
+            return None
+        return f"{info.st_mtime_ns}-{info.st_size}"
+
+    def open(self, key):
+        return open(key, 'rb')
+
+    def read_range(self, key, start, length):
+        with open(key, 'rb') as f:
+            f.seek(start)
+            return f.read(length)
+
+    def local_path(self, key):
+        return key
+
+    def delete(self, key):
+        if os.path.exists(key):
+            os.remove(key)
+
+
+class _S3RangeReader(io.RawIOBase):
+    """Seekable read-only file over an S3 object, fetched with ranged GETs."""
+
+    def __init__(self, storage, key, size):
+        self._storage, self._key, self._size, self._pos = storage, key, size, 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = max(base + offset, 0)
+        return self._pos
+
+    def readinto(self, buffer):
+        if self._pos >= self._size:
+            return 0
+        data = self._storage.read_range(self._key, self._pos, len(buffer))
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+class S3Storage:
+    """Keys are object names in an S3-compatible bucket (requires the optional boto3 package)."""
+    name = "s3"
+
+    def __init__(self, bucket=S3_BUCKET, prefix=S3_PREFIX, endpoint_url=S3_ENDPOINT_URL,
+                 cache_dir=STORAGE_CACHE_DIR, cache_max_bytes=STORAGE_CACHE_MAX_BYTES):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        if not bucket:
+            raise ValueError("S3_BUCKET must be set for the s3 storage backend")
+        self.bucket, self.prefix = bucket, prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        # Files above one chunk are uploaded/downloaded as parallel multipart transfers
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_CHUNK_SIZE,
+            multipart_chunksize=MULTIPART_CHUNK_SIZE,
+        )
+        self.cache_dir, self.cache_max_bytes = cache_dir, cache_max_bytes
+        self._versions = {}
+        self._cache_lock = threading.Lock()
+
+    def _object(self, key):
+        return f"{self.prefix}{key.replace(os.sep, '/')}"
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key.replace(os.sep, '/').lstrip('/'))
+
+    def _head(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def put_file(self, src_path, key):
+        """Upload the file at src_path (multipart when large) and keep it as the cached copy."""
+        self.client.upload_file(src_path, self.bucket, self._object(key), Config=self.transfer_config)
+        self._versions.pop(key, None)
+        cached = self._cache_path(key)
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        os.replace(src_path, cached)
+        self._evict(keep=cached)
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def size(self, key):
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head["ContentLength"]
+
+    def version(self, key):
+        if key not in self._versions:
+            head = self._head(key)
+            if head is None:
+                return None
+            self._versions[key] = f"{head['ETag'].strip(chr(34))}-{head['ContentLength']}"
+        return self._versions[key]
+
+    def open(self, key):
+        cached = self._cache_path(key)
+        if os.path.exists(cached):
+            return open(cached, 'rb')
+        return io.BufferedReader(_S3RangeReader(self, key, self.size(key)), buffer_size=MULTIPART_CHUNK_SIZE)
+
+    def read_range(self, key, start, length):
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=self._object(key), Range=f"bytes={start}-{start + length - 1}"
+        )
+        return response["Body"].read()
+
+    def local_path(self, key):
+        """Path of a local copy of key, downloaded into the cache on first use."""
+        cached = self._cache_path(key)
+        if os.path.exists(cached):
+            os.utime(cached)  # most recently used, see _evict
+            return cached
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self.client.download_file(self.bucket, self._object(key), tmp, Config=self.transfer_config)
+            os.replace(tmp, cached)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._evict(keep=cached)
+        return cached
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object(key))
+        self._versions.pop(key, None)
+        cached = self._cache_path(key)
+        if os.path.exists(cached):
+            os.remove(cached)
+
+    def _evict(self, keep=None):
+        """Drop least recently used cached copies (never `keep`) until the cache fits its byte budget."""
+        with self._cache_lock:
+            entries, total = [], 0
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if path == keep or name.endswith('.tmp'):
+                        continue
+                    try:
+                        info = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((info.st_mtime, info.st_size, path))
+                    total += info.st_size
+            for _, size, path in sorted(entries):
+                if total <= self.cache_max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+
+BACKENDS = {"local": LocalStorage, "s3": S3Storage}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Return the configured storage backend (STORAGE_BACKEND)."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = BACKENDS[STORAGE_BACKEND]()
+        return _storage
+
+
+def local_path(key):
+    return get_storage().local_path(key)
@@ -3,9 +3,12 @@ def dashboards_main_page():
     import os, uuid, json
     import pandas as pd
     from sqlalchemy import or_
-    from db import SessionLocal
+    from sqlalchemy.orm import joinedload
+    from db import get_session, release_session
     from models import User, Group, Report, Dashboard, Visualization, DashboardPermission, group_members
     from modules.dashboards import dashboards_builder, dashboards_preview, has_dashboard_permission, share_dashboard
+    from modules.permissions import user_group_ids
+    from modules.search_index import ranked_report_ids
     import streamlit as st 
     from modules.utils import safe_rerun 
     
@@ -102,10 +105,11 @@ def dashboards_main_page():
         st.error("You are not assigned to any organization.")
         return
 
-    session = SessionLocal()
+    session = get_session()
     try:
-        analytics_reports = (
+        analytics_query = (
             session.query(Report)
+            .options(joinedload(Report.owner))
             .filter(
                 Report.organization_id == org_id,
                 or_(
@@ -114,12 +118,19 @@ def dashboards_main_page():
                     Report.filename.ilike("%.xls")
                 )
             )
-            .all()
         )
-        if search_term:
-            analytics_reports = [
-                r for r in analytics_reports if search_term.lower() in r.title.lower() or search_term.lower() in r.filename.lower()
-            ]
+        ranked_ids = ranked_report_ids(
+            session, search_term, org_id, extensions=("csv", "xlsx", "xls")
+        ) if search_term else None
+        if ranked_ids is not None:
+            # Best matches first (titles, filenames, folders and column headers)
+            rank = {report_id: i for i, report_id in enumerate(ranked_ids)}
+            analytics_reports = sorted(
+                analytics_query.filter(Report.id.in_(ranked_ids)).all(),
+                key=lambda r: rank[r.id]
+            )
+        else:
+            analytics_reports = analytics_query.all()
         if not analytics_reports:
             st.info("No eligible data sources found.")
         else:
@@ -127,11 +138,16 @@ def dashboards_main_page():
                 ext = r.filename.split(".")[-1].lower()
                 icon_map = {'csv': 'fa-file-csv', 'xlsx': 'fa-file-excel', 'xls': 'fa-file-excel'}
                 fa_icon = icon_map.get(ext, 'fa-database')
-                owner = session.query(User).filter_by(id=r.owner_id).first()
+                owner = r.owner
                 uploader_name = owner.full_name if owner else "Unknown"
                 date_str = r.created_at.strftime('%Y-%m-%d')
-                size_bytes = os.path.getsize(r.filepath)
-                size_str = f"{size_bytes/1024:.0f} KB" if size_bytes < 1024*1024 else f"{size_bytes/1024/1024:.1f} MB"
+                size_bytes = r.size_bytes
+                if size_bytes is None:
+                    size_str = "—"
+                else:
+                    size_str = f"{size_bytes/1024:.0f} KB" if size_bytes < 1024*1024 else f"{size_bytes/1024/1024:.1f} MB"
+                if r.row_count is not None:
+                    size_str += f" &nbsp; <i class='fa-solid fa-table-cells'></i> {r.row_count:,} rows × {r.column_count} cols"
                 tag_str = f"<span style='background:#dcffe4;color:#178548;border-radius:5px;padding:3px 11px;font-size:.93em;margin-left:7px;'><i class='fa-solid fa-database'></i> Data Source</span>"
                 ext_tag = f"<span style='background:#e7f3ff;color:#255a93;border-radius:4px;font-size:.95em;padding:2px 7px;margin-left:5px;'>{ext.upper()}</span>"
 
@@ -193,9 +209,7 @@ def dashboards_main_page():
         # -- Add any further dashboard selector, share, preview, and edit logic here as in your original code --
                 # Refresh user from DB to access up-to-date groups relationship
         # Always get the up-to-date ORM user object!
-        db_user = session.query(User).filter_by(id=user_id).first()
-        # (Assume loaded db_user as current user object)
-        user_groups = [g.id for g in db_user.groups] if db_user else []
+        user_groups = list(user_group_ids(session, user_id))
 
         dashboards = (
             session.query(Dashboard)
@@ -333,4 +347,4 @@ def dashboards_main_page():
 
 
     finally:
-        session.close()
+        release_session(session)
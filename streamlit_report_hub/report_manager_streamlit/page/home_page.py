@@ -1,10 +1,12 @@
 # page/home_page.py
 import streamlit as st
 import pandas as pd
-from db import get_session
+from db import get_session, release_session
 from models import Organization, Report, Dashboard, User
 import plotly.express as px
 from modules.utils import safe_rerun  
+from modules.metrics import get_metrics
+from modules.activity import activity_trend
 import datetime 
 
 
@@ -46,21 +48,15 @@ def superadmin_home():
     st.subheader("System Overview")
     session = get_session()
     try:
-        now = datetime.datetime.now()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        week_start = now - datetime.timedelta(days=now.weekday())
-
-        org_count = session.query(Organization).count()
-        orgs_this_month = session.query(Organization).filter(Organization.created_at >= month_start).count()
-
-        user_count = session.query(User).count()
-        users_this_month = session.query(User).filter(User.created_at >= month_start).count()
-
-        report_count = session.query(Report).count()
-        reports_this_week = session.query(Report).filter(Report.created_at >= week_start).count()
-
-        dashboard_count = session.query(Dashboard).count()
-        dashboards_this_week = session.query(Dashboard).filter(Dashboard.created_at >= week_start).count()
+        metrics = get_metrics(session)
+        org_count = metrics["organizations"]
+        orgs_this_month = metrics["organizations_this_month"]
+        user_count = metrics["users"]
+        users_this_month = metrics["users_this_month"]
+        report_count = metrics["reports"]
+        reports_this_week = metrics["reports_this_week"]
+        dashboard_count = metrics["dashboards"]
+        dashboards_this_week = metrics["dashboards_this_week"]
 
         # Use icons instead of emojis
         col1, col2, col3, col4 = st.columns(4)
@@ -105,7 +101,7 @@ def superadmin_home():
             st.info("No organizations created yet.")
 
     finally:
-        session.close()
+        release_session(session)
 # -------------------------
 # Admin Home
 # -------------------------
@@ -121,24 +117,13 @@ def admin_home(user_id, org_id):
     st.subheader("Organization Overview")
     session = get_session()
     try:
-        now = datetime.datetime.now()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        week_start = now - datetime.timedelta(days=now.weekday())
-
-        user_count = session.query(User).filter_by(organization_id=org_id).count()
-        users_this_month = session.query(User).filter(
-            User.organization_id == org_id,
-            User.created_at >= month_start).count()
-
-        report_count = session.query(Report).filter_by(organization_id=org_id).count()
-        reports_this_week = session.query(Report).filter(
-            Report.organization_id == org_id,
-            Report.created_at >= week_start).count()
-
-        dashboard_count = session.query(Dashboard).filter_by(organization_id=org_id).count()
-        dashboards_this_week = session.query(Dashboard).filter(
-            Dashboard.organization_id == org_id,
-            Dashboard.created_at >= week_start).count()
+        metrics = get_metrics(session, org_id)
+        user_count = metrics["users"]
+        users_this_month = metrics["users_this_month"]
+        report_count = metrics["reports"]
+        reports_this_week = metrics["reports_this_week"]
+        dashboard_count = metrics["dashboards"]
+        dashboards_this_week = metrics["dashboards_this_week"]
 
         # Replace emojis with icons
         col1, col2, col3 = st.columns(3)
@@ -155,6 +140,17 @@ def admin_home(user_id, org_id):
         st.info("As Admin, you can invite users, manage groups, and organize reports/dashboards.")
         st.write("➡️ Use the sidebar to manage your organization.")
 
+        # Daily counters from the activity rollups (modules/activity.py)
+        trend_df = activity_trend(session, org_id, days=30)
+        fig = px.line(
+            trend_df,
+            x="Date",
+            y=["Reports", "Users", "Dashboards", "Comments"],
+            title="Activity Over the Last 30 Days",
+            markers=True,
+        )
+        st.plotly_chart(fig)
+
         # Recent Reports (cards)
         recent_reports = session.query(Report).filter_by(organization_id=org_id).order_by(Report.created_at.desc()).limit(5).all()
         st.markdown("### Recent Reports")
@@ -186,7 +182,6 @@ def admin_home(user_id, org_id):
                 "Dashboard": [d.name for d in recent_dashboards],
                 "Length of Description": [len(d.description or "") for d in recent_dashboards]
             })
-            import plotly.express as px
             fig = px.pie(pie_df, names="Dashboard", values="Length of Description",
                          title="Dashboard Description Length Distribution")
             st.plotly_chart(fig)
@@ -194,7 +189,7 @@ def admin_home(user_id, org_id):
             st.info("No dashboards created yet.")
 
     finally:
-        session.close()
+        release_session(session)
 
 # -------------------------
 # User Home
@@ -217,21 +212,13 @@ def user_home(user_id, org_id):
 
     session = get_session()
     try:
-        now = datetime.datetime.now()
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        week_start = now - datetime.timedelta(days=now.weekday())
+        metrics = get_metrics(session, org_id, owner_id=user_id)
+        reports_this_month = metrics["my_reports_this_month"]
+        dashboards_this_week = metrics["dashboards_this_week"]
 
         my_reports = session.query(Report).filter_by(owner_id=user_id).order_by(Report.created_at.desc()).all()
-        reports_this_month = session.query(Report).filter(
-            Report.owner_id == user_id,
-            Report.created_at >= month_start
-        ).count()
-
-        org_dashboards = session.query(Dashboard).filter_by(organization_id=org_id).order_by(Dashboard.created_at.desc()).all()
-        dashboards_this_week = session.query(Dashboard).filter(
-            Dashboard.organization_id == org_id,
-            Dashboard.created_at >= week_start
-        ).count()
+        # Only the five most recent are shown; the count comes from the metrics
+        org_dashboards = session.query(Dashboard).filter_by(organization_id=org_id).order_by(Dashboard.created_at.desc()).limit(5).all()
 
         col1, col2 = st.columns(2)
         with col1:
@@ -239,7 +226,7 @@ def user_home(user_id, org_id):
             st.metric("My Reports", len(my_reports), f"+{reports_this_month} this month")
         with col2:
             st.markdown('<div class="card metric-icon"><i class="fa-solid fa-chart-column"></i></div>', unsafe_allow_html=True)
-            st.metric("Org Dashboards", len(org_dashboards), f"+{dashboards_this_week} this week")
+            st.metric("Org Dashboards", metrics["dashboards"], f"+{dashboards_this_week} this week")
 
         st.info("As a User, you can generate reports and view dashboards.")
         st.write("➡️ Use the sidebar for quick access to your reports and dashboards.")
@@ -302,4 +289,4 @@ def user_home(user_id, org_id):
         else:
             st.info("No dashboards available in your organization yet.")
     finally:
-        session.close()
\ No newline at end of file
+        release_session(session)
\ No newline at end of file
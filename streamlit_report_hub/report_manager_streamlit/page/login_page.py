@@ -1,5 +1,5 @@
 import streamlit as st
-from db import SessionLocal
+from db import get_session, release_session
 from models import User
 from modules.auth import verify_password
 from modules.utils import safe_rerun
@@ -31,7 +31,7 @@ def login():
         st.subheader("Welcome back")
         st.caption("Enter your credentials to access your dashboard")
 
-        session = SessionLocal()
+        session = get_session()
         email = st.text_input("Email", placeholder="Enter your email", key="login_email")
         password = st.text_input("Password", type="password", placeholder="Enter your password", key="login_password")
         login_button = st.button("Sign in")
@@ -48,11 +48,11 @@ def login():
                 st.session_state.authenticated = True
                 st.session_state.role = st.session_state.user["role_name"]
                 st.success(f"Logged in as {st.session_state.user['email']} ({st.session_state.role})")
-                session.close()
+                release_session(session)
                 safe_rerun()
             else:
                 st.error("Invalid email or password")
-                session.close()
+                release_session(session)
 
         st.markdown("""
         <style>
@@ -1,5 +1,5 @@
 import streamlit as st
-from db import SessionLocal
+from db import get_session, release_session
 from models import User, Role
 from modules.auth import hash_password, superadmin_exists
 from modules.utils import safe_rerun
@@ -35,7 +35,7 @@ def register_via_token():
                     if not token or not name or not password:
                         st.error("Provide token, full name, and password.")
                         return
-                    s = SessionLocal()
+                    s = get_session()
                     try:
                         user = s.query(User).filter_by(invite_token=token).first()
                         if not user:
@@ -48,7 +48,7 @@ def register_via_token():
                         st.success("Registration complete, please login.")
                         st.session_state.show_register_form = False
                     finally:
-                        s.close()
+                        release_session(s)
         if st.button("Back to Login", key="register_to_login"):
             st.session_state["page_choice"] = "Login"
 
@@ -75,7 +75,7 @@ def create_superadmin_flow():
                 st.error("Please provide name, email, and password.")
                 return
             
-            s = SessionLocal()
+            s = get_session()
             try:
                 super_role = s.query(Role).filter_by(name="Superadmin").first()
                 if not super_role:
@@ -103,4 +103,4 @@ def create_superadmin_flow():
                 s.rollback()
                 st.error(f"Error creating Superadmin: {e}")
             finally:
-                s.close()
\ No newline at end of file
+                release_session(s)
\ No newline at end of file
@@ -1,6 +1,6 @@
 
 import streamlit as st
-from db import SessionLocal
+from db import get_session, release_session
 from models import User
 from modules.auth import hash_password
 from modules.utils import safe_rerun
@@ -28,7 +28,7 @@ def reset_password():
             st.markdown('</div>', unsafe_allow_html=True)
             return
 
-        session = SessionLocal()
+        session = get_session()
         try:
             user = session.query(User).filter_by(email=email).first()
             if not user:
@@ -52,7 +52,7 @@ def reset_password():
                     st.success("Password updated successfully. Redirecting to login page...")
                     safe_rerun()
         finally:
-            session.close()
+            release_session(session)
         st.markdown("""
         <style>
         div.stButton > button:first-child {
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import argparse
+
+# -------------------------
+# Chart Rendering Benchmark
+# -------------------------
+# Times build_visualization_result, the step behind every chart on a
+# dashboard, on synthetic data, and reports the figure JSON size sent to the
+# browser:
+# - aggregation: a Bar chart with color over 50 x 3 groups, raw rows
+#   (agg "none") against server-side sums (agg "sum");
+# - downsampling: Line (per color series), Scatter and Area charts, every
+#   row (a point budget as large as the data) against the default budget
+#   (CHART_POINT_BUDGET).
+# Run from the app directory:
+#   python scripts/bench_chart_rendering.py [--rows 1000000,5000000] [--points 2000000]
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _timed(viz_type, config, df):
+    from modules.dashboards import build_visualization_result
+
+    started = time.perf_counter()
+    result = build_visualization_result(viz_type, dict(config, filters={}), df)
+    return time.perf_counter() - started, len(result["figure"]) // 1000, result.get("note")
+
+
+def bench_aggregation(rows, rng):
+    import pandas as pd
+
+    df = pd.DataFrame({
+        "region": rng.choice([f"r{i}" for i in range(50)], rows),
+        "segment": rng.choice(["a", "b", "c"], rows),
+        "sales": rng.random(rows) * 100,
+    })
+    for agg in ("none", "sum"):
+        seconds, size_kb, _ = _timed("Bar", {"x": "region", "y": "sales", "color": "segment", "agg": agg}, df)
+        print(f"[Bench] Bar {rows:,} rows agg={agg}: {seconds:.2f}s, figure JSON {size_kb:,} KB")
+
+
+def bench_downsampling(rows, rng):
+    import numpy as np
+    import pandas as pd
+    from modules.downsampling import DEFAULT_POINT_BUDGET
+
+    df = pd.DataFrame({
+        "time": pd.date_range("2024-01-01", periods=rows, freq="s"),
+        "value": np.cumsum(rng.normal(size=rows)),
+        "device": rng.choice(["a", "b"], rows),
+        "weight": rng.random(rows),
+    })
+    charts = [
+        ("Line", {"x": "time", "y": "value", "color": "device", "agg": "none"}),
+        ("Scatter", {"x": "weight", "y": "value"}),
+        ("Area", {"x": "time", "y": "value"}),
+    ]
+    for viz_type, config in charts:
+        for budget in (rows, DEFAULT_POINT_BUDGET):
+            seconds, size_kb, note = _timed(viz_type, dict(config, point_budget=budget), df)
+            print(f"[Bench] {viz_type} {rows:,} rows point_budget={budget:,}: {seconds:.2f}s, "
+                  f"figure JSON {size_kb:,} KB{f' ({note})' if note else ''}")
+
+
+def main():
+    import numpy as np
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="1000000,5000000", help="comma-separated row counts for the Bar chart")
+    parser.add_argument("--points", type=int, default=2000000, help="rows for the Line, Scatter and Area charts")
+    args = parser.parse_args()
+
+    sys.path.insert(0, APP_DIR)
+    rng = np.random.default_rng(0)
+    for rows in (int(n) for n in args.rows.split(",")):
+        bench_aggregation(rows, rng)
+    bench_downsampling(args.points, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import uuid
+import random
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+# -------------------------
+# SQLite Concurrency Benchmark
+# -------------------------
+# Several processes share one SQLite file the way concurrent Streamlit
+# sessions do: most iterations read a page of the report listing and one
+# report's comments, the rest insert comments. Prints throughput, errors
+# ("database is locked") and latency for the SQLITE_MODE it runs under.
+# Compare the modes from the app directory (basic with the old 5 s timeout):
+#   SQLITE_MODE=basic SQLITE_BUSY_TIMEOUT_MS=5000 python scripts/bench_sqlite_concurrency.py
+#   SQLITE_MODE=production python scripts/bench_sqlite_concurrency.py
+# --batch 200 makes every write insert 200 comments in one transaction.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _seed(reports):
+    from db import SessionLocal, init_db
+    from models import Base, Role, Organization, User, Report
+
+    init_db(Base, Role)
+    s = SessionLocal()
+    try:
+        s.add(Organization(id="o", name="Bench"))
+        s.add(User(id="u", full_name="Bench", email="bench@example.com", password_hash="-", organization_id="o"))
+        s.add_all([
+            Report(id=f"r{i}", title=f"Report {i}", filename="r.csv", filepath="r.csv", owner_id="u", organization_id="o")
+            for i in range(reports)
+        ])
+        s.commit()
+    finally:
+        s.close()
+
+
+def _worker(n, args, start, results):
+    from db import SessionLocal
+    from models import Report, Comment
+
+    rnd = random.Random(n)
+    start.wait()  # every worker has imported the app and built its engine
+    stop_at = time.time() + args.duration
+    stats = {"reads": 0, "writes": 0, "errors": 0, "latencies": [], "error": None}
+    while time.time() < stop_at:
+        s = SessionLocal()
+        started = time.perf_counter()
+        try:
+            if rnd.random() < args.write_share:
+                s.add_all([
+                    Comment(id=str(uuid.uuid4()), report_id=f"r{rnd.randrange(args.reports)}", user_id="u", comment="x" * 200)
+                    for _ in range(args.batch)
+                ])
+                s.commit()
+                kind = "writes"
+            else:
+                s.query(Report).filter(Report.organization_id == "o").order_by(Report.created_at.desc()).limit(25).all()
+                s.query(Comment).filter(Comment.report_id == f"r{rnd.randrange(args.reports)}").all()
+                kind = "reads"
+            stats[kind] += 1
+            stats["latencies"].append(time.perf_counter() - started)
+        except Exception as e:
+            s.rollback()
+            stats["errors"] += 1
+            stats["error"] = stats["error"] or str(e)[:80]
+        finally:
+            s.close()
+    results.put(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--procs", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=8.0, help="seconds")
+    parser.add_argument("--reports", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1, help="comments per write transaction")
+    parser.add_argument("--write-share", type=float, default=0.2)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="report_hub_bench_")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+    os.chdir(workdir)
+    sys.path.insert(0, APP_DIR)
+    try:
+        _run(args)
+    finally:
+        os.chdir(APP_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run(args):
+    _seed(args.reports)
+
+    # Fresh interpreters, so every worker builds its engine (pool, pragmas) like an app process
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    start = context.Barrier(args.procs)
+    procs = [context.Process(target=_worker, args=(n, args, start, results)) for n in range(args.procs)]
+    for p in procs:
+        p.start()
+    runs = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    latencies = sorted(x for r in runs for x in r["latencies"])
+    percentile = lambda q: latencies[min(int(len(latencies) * q), len(latencies) - 1)] * 1000 if latencies else 0
+    reads, writes, errors = (sum(r[k] for r in runs) for k in ("reads", "writes", "errors"))
+    print(
+        f"[Bench] SQLITE_MODE={os.getenv('SQLITE_MODE', 'production')} procs={args.procs} batch={args.batch}: "
+        f"{reads / args.duration:.0f} reads/s, {writes / args.duration:.0f} writes/s, {errors} errors, "
+        f"p50 {percentile(0.5):.1f} ms, p99 {percentile(0.99):.1f} ms"
+    )
+    error = next((r["error"] for r in runs if r["error"]), None)
+    if error:
+        print(f"[Bench] First error: {error}")
+
+
+if __name__ == "__main__":
+    main()
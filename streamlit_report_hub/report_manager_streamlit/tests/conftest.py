@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# -------------------------
+# Test Database
+# -------------------------
+# db.py reads DATABASE_URL on import, so the tests point it at a throwaway
+# SQLite file (with the production pragmas) before anything imports it and
+# run from a temporary directory so uploads and caches stay out of the tree.
+# Every test drops and recreates the tables: to run them against another
+# database (e.g. an empty PostgreSQL one) set TEST_DATABASE_URL, never the
+# app's DATABASE_URL.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="report_hub_tests_")
+sys.path.insert(0, APP_DIR)
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or "sqlite:///" + os.path.join(WORK_DIR, "test.db")
+os.chdir(WORK_DIR)
+
+
+@pytest.fixture
+def session():
+    """A session on freshly created tables holding the default roles."""
+    from db import engine, SessionLocal
+    from models import Base, Role
+    from sqlalchemy import text
+    from modules import activity, report_access, metrics, permissions, search_index
+
+    Base.metadata.drop_all(bind=engine)
+    if engine.dialect.name == "sqlite":
+        # The FTS index is not part of the models' metadata
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {search_index.FTS_TABLE}"))
+    Base.metadata.create_all(bind=engine)
+    activity._populated = report_access._populated = False
+    search_index._backend = None
+    metrics.clear_metrics_cache()
+    permissions.clear_permission_cache()
+
+    s = SessionLocal()
+    s.add_all([Role(name="Superadmin"), Role(name="Admin"), Role(name="User")])
+    s.commit()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+@pytest.fixture
+def count_statements():
+    """Context manager counting the statements sent to the database while it is open."""
+    from contextlib import contextmanager
+    from sqlalchemy import event
+    from db import engine
+
+    @contextmanager
+    def counting():
+        counter = {"statements": 0}
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            counter["statements"] += 1
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+    return counting
@@ -0,0 +1,70 @@
+# -------------------------
+# Daily activity rollups
+# -------------------------
+# org_activity_daily must keep matching the source tables when rows change
+# organization, not only when they are added or deleted.
+
+
+def _seed(session):
+    from models import Organization, User, Report, Comment
+
+    session.add_all([Organization(id="o1", name="One"), Organization(id="o2", name="Two")])
+    session.add(User(id="u1", full_name="Ada", email="a@x", password_hash="x", organization_id="o1"))
+    session.add(Report(id="r1", title="Sales", filename="a.csv", filepath="uploads/a.csv", owner_id="u1", organization_id="o1"))
+    session.add(Comment(id="c1", report_id="r1", user_id="u1", comment="First"))
+    session.commit()
+
+
+def test_invite_existing_user_moves_their_count(session):
+    from models import User
+    from modules.activity import check_activity_rollups
+    from modules.metrics import get_metrics, clear_metrics_cache
+
+    _seed(session)
+    # What create_invite does for an email that already has an account
+    user = session.query(User).filter_by(email="a@x").first()
+    user.invite_token = "token"
+    user.organization_id = "o2"
+    session.commit()
+
+    clear_metrics_cache()
+    assert get_metrics(session, "o1")["users"] == 0
+    assert get_metrics(session, "o2")["users"] == 1
+    assert check_activity_rollups(repair=False) == set()
+
+
+def test_moved_report_takes_its_comments(session):
+    from models import Report
+    from modules.activity import check_activity_rollups
+    from modules.metrics import get_metrics, clear_metrics_cache
+
+    _seed(session)
+    session.expire_all()  # the old organization_id is not loaded when it changes
+    session.get(Report, "r1").organization_id = "o2"
+    session.commit()
+
+    clear_metrics_cache()
+    o1, o2 = get_metrics(session, "o1"), get_metrics(session, "o2")
+    assert (o1["reports"], o1["comments"], o2["reports"], o2["comments"]) == (0, 0, 1, 1)
+    assert check_activity_rollups(repair=False) == set()
+
+
+def test_system_wide_counts_sum_every_organization(session):
+    import datetime
+    from models import OrgActivityDaily
+    from modules import activity
+    from modules.activity import LEGACY_ALL_ORGS, activity_trend, check_activity_rollups
+    from modules.metrics import get_metrics
+
+    _seed(session)
+    # A row of totals left by an earlier release
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    session.add(OrgActivityDaily(organization_id=LEGACY_ALL_ORGS, day=today, reports=1, users=1, dashboards=0, comments=1))
+    session.commit()
+    activity._populated = False
+
+    metrics = get_metrics(session)
+    assert (metrics["users"], metrics["reports"], metrics["comments"]) == (1, 1, 1)
+    assert activity_trend(session, days=1)[["Users", "Reports", "Comments"]].values.tolist() == [[1, 1, 1]]
+    assert session.query(OrgActivityDaily).filter_by(organization_id=LEGACY_ALL_ORGS).count() == 0
+    assert check_activity_rollups(repair=False) == set()
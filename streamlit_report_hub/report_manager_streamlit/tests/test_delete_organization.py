@@ -0,0 +1,45 @@
+import os
+
+# -------------------------
+# Deleting organizations
+# -------------------------
+# An organization's reports are deleted with it; the stored files they
+# referenced must be released, not left behind with inflated ref counts.
+
+
+def _store(session, content_hash, text):
+    from modules.blob_store import store_blob, incoming_path
+
+    tmp_path = incoming_path()
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    return store_blob(session, tmp_path, content_hash, "csv")
+
+
+def test_delete_organization_releases_report_files(session):
+    from models import Organization, User, Report, Blob
+    from modules.blob_store import release_report_files
+    from modules.permissions import bump_permission_version
+
+    session.add_all([Organization(id="o1", name="Gone"), Organization(id="o2", name="Stays")])
+    session.add(User(id="u1", full_name="Ada", email="a@x", password_hash="x", organization_id="o1"))
+    session.add(User(id="u2", full_name="Bob", email="b@x", password_hash="x", organization_id="o2"))
+    own = _store(session, "aa" * 32, "a,b\n1,2\n")
+    shared = _store(session, "bb" * 32, "c,d\n3,4\n")
+    assert _store(session, "bb" * 32, "c,d\n3,4\n") == shared
+    session.add(Report(id="r1", title="Own", filename="a.csv", filepath=own, owner_id="u1", organization_id="o1"))
+    session.add(Report(id="r2", title="Shared", filename="b.csv", filepath=shared, owner_id="u1", organization_id="o1"))
+    session.add(Report(id="r3", title="Shared", filename="b.csv", filepath=shared, owner_id="u2", organization_id="o2"))
+    session.commit()
+
+    # What superadmin_org_management does on "Confirm Delete"
+    org = session.get(Organization, "o1")
+    release_report_files(session, org.reports)
+    session.delete(org)
+    bump_permission_version(session)
+    session.commit()
+
+    session.expire_all()
+    assert [r.id for r in session.query(Report)] == ["r3"]
+    assert session.get(Blob, own) is None and not os.path.exists(own)
+    assert session.get(Blob, shared).ref_count == 1 and os.path.exists(shared)
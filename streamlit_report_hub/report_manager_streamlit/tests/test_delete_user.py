@@ -0,0 +1,78 @@
+from streamlit.testing.v1 import AppTest
+
+# -------------------------
+# Deleting users with foreign keys enforced
+# -------------------------
+# conftest's SQLite database runs with PRAGMA foreign_keys=ON, like production.
+DELETE_USER = """
+from modules.organization import delete_user
+delete_user("u2")
+"""
+
+
+def _seed(session):
+    """u2 owns a stored report, comments on u1's report, holds direct grants, created a dashboard and is in a group."""
+    from models import (
+        Organization, User, Role, Group, Report, ReportPermission, Comment, Dashboard, DashboardPermission, Blob,
+    )
+    from modules.blob_store import store_blob, incoming_path
+    from modules.report_access import rebuild_report_access
+
+    role = session.query(Role).filter_by(name="User").one()
+    session.add(Organization(id="o", name="Org"))
+    session.add(User(id="u1", full_name="Ada", email="a@x", password_hash="x", organization_id="o", role_id=role.id))
+    u2 = User(id="u2", full_name="Bob", email="b@x", password_hash="x", organization_id="o", role_id=role.id)
+    session.add(u2)
+    group = Group(id="g1", name="Team", organization_id="o")
+    group.users.append(u2)
+    session.add(group)
+
+    tmp_path = incoming_path()
+    with open(tmp_path, "w") as f:
+        f.write("region,sales\nn,1\n")
+    filepath = store_blob(session, tmp_path, "ab" * 32, "csv")
+    session.add(Report(id="r1", title="Shared", filename="a.csv", filepath="uploads/a.csv", owner_id="u1", organization_id="o"))
+    session.add(Report(id="r2", title="Bob's", filename="b.csv", filepath=filepath, owner_id="u2", organization_id="o"))
+    session.add(ReportPermission(id="p1", report_id="r1", user_id="u2", level="Editor"))
+    session.add(ReportPermission(id="p2", report_id="r2", user_id="u1", level="Viewer"))
+    session.add(Comment(id="c1", report_id="r1", user_id="u2", comment="Mine"))
+    session.add(Comment(id="c2", report_id="r2", user_id="u1", comment="On Bob's report"))
+    session.add(Dashboard(id="d1", name="Bob's dashboard", organization_id="o", created_by_id="u2"))
+    session.add(Dashboard(id="d2", name="Ada's dashboard", organization_id="o", created_by_id="u1"))
+    session.add(DashboardPermission(id="dp1", dashboard_id="d2", user_id="u2", level="Editor"))
+    session.flush()
+    rebuild_report_access(session)
+    session.commit()
+    assert session.get(Blob, filepath).ref_count == 1
+    return filepath
+
+
+def test_delete_user_with_dependents(session):
+    import os
+    from models import User, Report, ReportPermission, Comment, Dashboard, DashboardPermission, Blob, group_members
+    from modules.activity import check_activity_rollups
+    from modules.report_access import check_report_access
+
+    filepath = _seed(session)
+
+    at = AppTest.from_string(DELETE_USER, default_timeout=30)
+    at.run()
+    assert not at.exception, [e.value for e in at.exception]
+    assert not at.error, [e.value for e in at.error]
+    assert [m.value for m in at.success] == ["User deleted successfully! 🗑️"]
+
+    session.expire_all()
+    assert session.get(User, "u2") is None
+    assert session.get(User, "u1") is not None
+    # Their own report goes, with the comments on it and its stored file
+    assert [r.id for r in session.query(Report)] == ["r1"]
+    assert session.get(Blob, filepath) is None and not os.path.exists(filepath)
+    assert session.query(Comment).count() == 0
+    assert session.query(ReportPermission).count() == 0
+    assert session.query(DashboardPermission).count() == 0
+    assert session.query(group_members).count() == 0
+    # Dashboards stay with the organization
+    assert {d.id: d.created_by_id for d in session.query(Dashboard)} == {"d1": None, "d2": "u1"}
+    # Derived tables still match their sources
+    assert check_activity_rollups(repair=False) == set()
+    assert check_report_access(repair=False) == (set(), set())
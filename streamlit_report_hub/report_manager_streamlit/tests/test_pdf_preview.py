@@ -0,0 +1,53 @@
+import importlib.util
+import pytest
+from streamlit.testing.v1 import AppTest
+
+# -------------------------
+# PDF cards
+# -------------------------
+# An open card reruns on every widget change; the PDF must not be read from
+# storage on each of those reruns.
+SHOW_PDF = """
+import types
+from modules import pdf_preview
+
+pdf_preview.MAX_INLINE_PDF_SIZE = {max_inline}
+report = types.SimpleNamespace(id="r1", content_hash="h1", filepath="doc.pdf", filename="doc.pdf", size_bytes=64)
+pdf_preview.show_pdf(report, key="pdf_r1")
+"""
+
+
+@pytest.fixture
+def pdf_file():
+    from modules.pdf_preview import _pdf_bytes
+
+    _pdf_bytes.clear()
+    with open("doc.pdf", "wb") as f:
+        f.write(b"%PDF-1.4\n%%EOF\n")
+    yield "doc.pdf"
+    _pdf_bytes.clear()
+
+
+def test_inline_pdf_is_read_once(pdf_file):
+    import os
+
+    if importlib.util.find_spec("streamlit_pdf") is None:
+        pytest.skip("streamlit[pdf] is not installed")
+    at = AppTest.from_string(SHOW_PDF.format(max_inline=1024), default_timeout=30)
+    at.run()
+    assert not at.exception, [e.value for e in at.exception]
+
+    os.remove(pdf_file)  # later reruns are served from the cache
+    at.run()
+    assert not at.exception, [e.value for e in at.exception]
+
+
+def test_download_reads_the_file_only_when_clicked(pdf_file):
+    import os
+
+    os.remove(pdf_file)
+    at = AppTest.from_string(SHOW_PDF.format(max_inline=0), default_timeout=30)
+    at.run()
+    assert not at.exception, [e.value for e in at.exception]
+    assert [i.value for i in at.info] == ["Inline preview is unavailable for this PDF."]
+    assert len(at.get("download_button")) == 1
@@ -0,0 +1,101 @@
+import os
+import datetime
+import pytest
+from streamlit.testing.v1 import AppTest
+
+# -------------------------
+# Statements per page render
+# -------------------------
+# The reports listing and the dashboards page (data sources and dashboard
+# list) must issue the same number of statements whatever the number of
+# reports and folders, i.e. no query per card or per folder.
+REPORTS_PAGE = """
+from modules.reports import reports_page
+reports_page()
+"""
+DASHBOARDS_PAGE = """
+from page.dashboard_page import dashboards_main_page
+dashboards_main_page()
+"""
+
+
+def _seed_org(session):
+    from models import Organization, User, Role, Dashboard
+
+    admin = session.query(Role).filter_by(name="Admin").one()
+    session.add(Organization(id="o", name="Org"))
+    session.add(User(id="u1", full_name="Ada", email="a@x", password_hash="x", organization_id="o", role_id=admin.id))
+    session.add(User(id="u2", full_name="Bob", email="b@x", password_hash="x", organization_id="o", role_id=admin.id))
+    session.add(Dashboard(id="d1", name="Dash", organization_id="o", created_by_id="u1"))
+    session.commit()
+
+
+def _add_reports(session, ids):
+    """
+    Per id: a folder, and a CSV report with its own uploader, shared with u1
+    (Editor) and u2 (Commenter), and commented on by u2.
+    """
+    from models import User, Folder, Report, ReportPermission, Comment
+    from modules.report_access import refresh_report_access
+
+    start = datetime.datetime(2024, 1, 1)
+    for i in ids:
+        session.add(User(id=f"up{i}", full_name=f"Uploader {i}", email=f"up{i}@x", password_hash="x", organization_id="o"))
+        session.add(Folder(id=f"f{i}", name=f"Folder {i}", organization_id="o"))
+        session.add(Report(
+            id=f"r{i}", title=f"Report {i}", filename=f"data{i}.csv", file_ext="csv",
+            filepath=f"uploads/o/data{i}.csv", size_bytes=1024, owner_id=f"up{i}", organization_id="o",
+            created_at=start + datetime.timedelta(hours=i),
+        ))
+        session.add(ReportPermission(id=f"pa{i}", report_id=f"r{i}", user_id="u1", level="Editor"))
+        session.add(ReportPermission(id=f"pb{i}", report_id=f"r{i}", user_id="u2", level="Commenter"))
+        session.add(Comment(id=f"c{i}", report_id=f"r{i}", user_id="u2", comment="Looks good"))
+    refresh_report_access(session, [f"r{i}" for i in ids])
+    session.commit()
+
+
+def _statements(script, user_id, count_statements):
+    """Statements issued by a rerun of script, after a first run has warmed the per-process caches."""
+    at = AppTest.from_string(script, default_timeout=60)
+    at.session_state["user"] = {
+        "id": user_id, "email": f"{user_id}@x", "role_name": "Admin", "organization_id": "o", "full_name": user_id,
+    }
+    at.session_state["authenticated"] = True
+    at.session_state["report_page_size"] = 100  # every report on one page
+    at.run()
+    with count_statements() as counter:
+        at.run()
+    assert not at.exception, [e.value for e in at.exception]
+    assert not at.error, [e.value for e in at.error]
+    return at, counter["statements"]
+
+
+@pytest.mark.parametrize("script", [REPORTS_PAGE, DASHBOARDS_PAGE], ids=["reports", "dashboards"])
+@pytest.mark.parametrize("user_id", ["u1", "u2"], ids=["editor", "commenter"])
+def test_statements_do_not_grow_with_reports(session, count_statements, script, user_id):
+    _seed_org(session)
+    _add_reports(session, range(1))
+    _, with_one = _statements(script, user_id, count_statements)
+
+    _add_reports(session, range(1, 50))
+    at, with_fifty = _statements(script, user_id, count_statements)
+
+    # The second render really lists the 50 reports
+    rendered = " ".join(m.value for m in at.markdown)
+    assert "Report 49" in rendered and "Uploader 49" in rendered
+    assert with_fifty == with_one
+
+
+def test_comments_load_when_a_card_is_opened(session, count_statements):
+    _seed_org(session)
+    _add_reports(session, range(1))
+    os.makedirs("uploads/o", exist_ok=True)
+    with open("uploads/o/data0.csv", "w") as f:
+        f.write("a,b\n1,2\n")
+    at, _ = _statements(REPORTS_PAGE, "u1", count_statements)
+    assert "Looks good" not in " ".join(m.value for m in at.markdown)
+
+    at.toggle(key="details_r0").set_value(True).run()
+    assert not at.exception, [e.value for e in at.exception]
+    assert not at.error, [e.value for e in at.error]
+    assert "Looks good" in " ".join(m.value for m in at.markdown)
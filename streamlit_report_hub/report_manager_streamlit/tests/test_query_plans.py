@@ -0,0 +1,102 @@
+import re
+import pytest
+from sqlalchemy import event, insert
+
+# -------------------------
+# Query plans of the hot lookups
+# -------------------------
+# Runs the hot permission and listing lookups (reports_query,
+# get_effective_permissions, has_dashboard_permission, display_comments),
+# EXPLAINs every SELECT they issue and fails on any table read with a full
+# scan instead of an index. The schema comes from models.py, so this checks
+# the declared indexes; set TEST_DATABASE_URL to an empty PostgreSQL database
+# to check them there too.
+_SQLITE_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\w+)\b(?! USING)")
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+LOOKUPS = [
+    "reports_query (root)",
+    "reports_query (folder)",
+    "get_effective_permissions",
+    "has_dashboard_permission",
+    "display_comments",
+]
+
+
+def _seed(session):
+    """One row of each kind: a member of a group granted a report and a dashboard it did not create."""
+    from models import Organization, User, Group, Report, ReportPermission, Dashboard, DashboardPermission, group_members
+
+    session.add(Organization(id="org", name="Org"))
+    session.add(User(id="owner", full_name="Owner", email="owner@example.com", password_hash="-", organization_id="org"))
+    session.add(User(id="member", full_name="Member", email="member@example.com", password_hash="-", organization_id="org"))
+    session.add(Group(id="group", name="Group", organization_id="org"))
+    session.add(Report(id="report", title="Report", filename="report.csv", filepath="report.csv",
+                       owner_id="owner", organization_id="org"))
+    session.add(ReportPermission(report_id="report", group_id="group", level="Viewer"))
+    session.add(Dashboard(id="dashboard", name="Dashboard", organization_id="org", created_by_id="owner"))
+    session.add(DashboardPermission(dashboard_id="dashboard", group_id="group", level="Viewer"))
+    session.flush()
+    session.execute(insert(group_members).values(user_id="member", group_id="group"))
+    session.commit()
+
+
+def _lookup(session, name):
+    from models import Report
+    from modules.reports import reports_query, display_comments
+    from modules.permissions import get_effective_permissions
+    from modules.dashboards import has_dashboard_permission
+
+    user = {"id": "member", "organization_id": "org"}
+    report = session.get(Report, "report")
+    return {
+        "reports_query (root)": lambda: reports_query(session, user, None).all(),
+        "reports_query (folder)": lambda: reports_query(session, user, "-").all(),
+        "get_effective_permissions": lambda: get_effective_permissions(session, user, [report]),
+        "has_dashboard_permission": lambda: has_dashboard_permission(session, "dashboard", user["id"]),
+        "display_comments": lambda: display_comments(session, report.id),
+    }[name]
+
+
+def _full_scans(connection, statement, parameters):
+    """Tables the database would read in full to run statement."""
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return [m.group(1) for m in (_SQLITE_SCAN.match(row[-1]) for row in rows) if m]
+    # PostgreSQL: tiny tables are always cheaper to scan; only report scans no index could avoid
+    connection.exec_driver_sql("SET enable_seqscan = off")
+    rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).fetchall()
+    connection.exec_driver_sql("RESET enable_seqscan")
+    return [m.group(1) for m in (_POSTGRES_SCAN.search(row[0]) for row in rows) if m]
+
+
+@pytest.mark.parametrize("lookup", LOOKUPS)
+def test_hot_lookup_uses_indexes(session, lookup):
+    from db import engine
+    from modules.report_access import ensure_report_access
+
+    if engine.dialect.name not in ("sqlite", "postgresql"):
+        pytest.skip(f"No query plan check for {engine.dialect.name}")
+    _seed(session)
+    ensure_report_access()  # one-time fill, not part of the lookups
+    run = _lookup(session, lookup)
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert statements, f"{lookup} issued no SELECT"
+
+    with engine.connect() as connection:
+        scans = [
+            f"{table}:\n{statement}"
+            for statement, parameters in statements
+            for table in _full_scans(connection, statement, parameters)
+        ]
+    assert not scans, f"{lookup} scans " + "\n\n".join(scans)
@@ -0,0 +1,24 @@
+# -------------------------
+# Filling user_report_access on first use
+# -------------------------
+# Databases from before the table existed have reports but no access rows;
+# the first lookup builds them without touching the caller's transaction.
+
+
+def test_first_lookup_leaves_caller_transaction_alone(session):
+    from models import Organization, User, Report, UserReportAccess
+    from modules.report_access import accessible_report_ids
+
+    session.add(Organization(id="o", name="Org"))
+    session.add(User(id="u1", full_name="Ada", email="a@x", password_hash="x", organization_id="o"))
+    session.add(Report(id="r1", title="Legacy", filename="a.csv", filepath="uploads/a.csv", owner_id="u1", organization_id="o"))
+    session.commit()
+    assert session.query(UserReportAccess).count() == 0
+
+    # An edit the caller has not flushed or committed yet
+    session.get(Report, "r1").title = "Unsaved"
+    assert [rid for (rid,) in session.execute(accessible_report_ids(session, "u1"))] == ["r1"]
+
+    session.rollback()
+    assert session.get(Report, "r1").title == "Legacy"
+    assert session.query(UserReportAccess.user_id, UserReportAccess.report_id).all() == [("u1", "r1")]
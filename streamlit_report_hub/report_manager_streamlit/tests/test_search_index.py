@@ -0,0 +1,29 @@
+# -------------------------
+# Searching reports from before the search index
+# -------------------------
+# init_db gives every report without a search document one, so upgraded
+# installs find their existing reports by title, filename and folder.
+
+
+def test_init_db_indexes_existing_reports(session):
+    import db
+    from models import Base, Role, Organization, User, Folder, Report, SearchDocument
+    from modules.search_index import ranked_report_ids
+
+    session.add(Organization(id="o", name="Org"))
+    session.add(User(id="u1", full_name="Ada", email="a@x", password_hash="x", organization_id="o"))
+    session.add(Folder(id="f1", name="Finance", organization_id="o"))
+    session.add(Report(id="r1", title="Quarterly sales", filename="q3.csv", filepath="q3.csv",
+                       owner_id="u1", organization_id="o", folder_id="f1"))
+    session.add(Report(id="r2", title="Handbook", filename="handbook.pdf", filepath="handbook.pdf",
+                       owner_id="u1", organization_id="o"))
+    session.commit()
+    assert session.query(SearchDocument).count() == 0
+
+    db._initialized = False
+    db.init_db(Base, Role)
+
+    assert session.query(SearchDocument).count() == 2
+    assert ranked_report_ids(session, "quarterly") == ["r1"]
+    assert ranked_report_ids(session, "financ") == ["r1"]
+    assert ranked_report_ids(session, "handbook", organization_id="o") == ["r2"]